@@ -1,17 +1,39 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, UploadFile, File
 from fastapi import status as http_status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
+from fastapi.encoders import jsonable_encoder
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers, MutableHeaders
 from motor.motor_asyncio import AsyncIOMotorClient
+from motor.frameworks import asyncio as motor_asyncio_framework
 import os
 import logging
 import secrets
 import hashlib
+import atexit
+import sys
 import traceback
+import bisect
+import threading
+import queue
+import contextvars
+import logging.handlers
 import shutil
+import re
+import random
+import math
+import asyncio
+import json
+import csv
+import zlib
+import gzip
+import smtplib
+import email.policy
+import email.utils
+from email.message import EmailMessage
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
 from typing import List, Optional
@@ -19,26 +41,368 @@ import uuid
 from datetime import datetime, timezone, timedelta
 import bcrypt
 import jwt
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 import time
 from PIL import Image
 import io
-
-# Configure detailed logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+from urllib.parse import urlsplit
+from pymongo import UpdateOne, ReturnDocument, monitoring
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+
+try:
+    import orjson  # Compiled JSON encoder for FastJSONResponse
+except ImportError:
+    orjson = None
+
+try:
+    import brotli  # Optional: Brotli response compression (gzip is always available)
+except ImportError:
+    brotli = None
+
+try:
+    import pandas as pd  # Parquet archival of analytics events (needs pyarrow)
+except ImportError:
+    pd = None
+
+try:
+    import pyarrow.parquet as pq  # Batch-wise reads of archived Parquet parts
+except ImportError:
+    pq = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# ============ LOGGING ============
+
+# Records are handed to a QueueHandler and written by a QueueListener thread, so
+# formatting and stream I/O never run on the event loop. LOG_FORMAT=json emits
+# one JSON object per line; structured fields go in the `fields` extra.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()  # json, text
+LOG_SUCCESS_SAMPLE_RATE = float(os.environ.get('LOG_SUCCESS_SAMPLE_RATE', '1.0'))
+LOG_SLOW_REQUEST_SECONDS = float(os.environ.get('LOG_SLOW_REQUEST_SECONDS', '1.0'))
+
+class JsonLogFormatter(logging.Formatter):
+    """Format a record as a single JSON line"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting (and tracebacks) to the listener thread"""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+def configure_logging() -> logging.handlers.QueueListener:
+    stream_handler = logging.StreamHandler()
+    if LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonLogFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [DeferredQueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL)
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+log_listener = configure_logging()
+logger = logging.getLogger(__name__)
+
+# Per-request state shared with code running under the request (including the
+# Motor executor threads, which copy the context). Holds a mutable dict.
+request_context = contextvars.ContextVar("request_context", default=None)
+
+# Mongo command profiling: every command is attributed to the request that
+# issued it. A "shape" is the command with literal values blanked out, so the
+# same query run in a loop (N+1) shows up as one shape with a high count.
+DB_PROFILE_HEADERS = os.environ.get('DB_PROFILE_HEADERS', 'false').lower() == 'true'
+DB_REPEATED_SHAPE_THRESHOLD = int(os.environ.get('DB_REPEATED_SHAPE_THRESHOLD', '10'))
+DB_SHAPE_FIELDS = ("filter", "q", "query", "pipeline", "sort", "updates", "deletes")
+
+def query_shape(value):
+    """Replace literals with '?' keeping keys and operators"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # Batched writes and $in lists vary in length; one element is enough
+        return [query_shape(value[0])] if value else []
+    return "?"
+
+def command_shape(event) -> str:
+    command = event.command
+    collection = command.get(event.command_name)
+    parts = {field: query_shape(command[field]) for field in DB_SHAPE_FIELDS if field in command}
+    return f"{event.command_name} {collection} {json.dumps(parts, sort_keys=True, default=str)}"
+
+def new_request_context(request_id: str) -> dict:
+    return {"request_id": request_id, "db_calls": 0, "db_seconds": 0.0, "db_shapes": defaultdict(int)}
+
+class DbCommandProfiler(monitoring.CommandListener):
+    """Attribute MongoDB commands (count, time, shape) to the current request"""
+    
+    def started(self, event):
+        ctx = request_context.get()
+        if ctx is not None:
+            ctx["db_calls"] += 1
+            ctx["db_shapes"][command_shape(event)] += 1
+    
+    def succeeded(self, event):
+        ctx = request_context.get()
+        if ctx is not None:
+            ctx["db_seconds"] += event.duration_micros / 1e6
+    
+    def failed(self, event):
+        self.succeeded(event)
+
+def repeated_db_shapes(ctx: dict) -> dict:
+    return {shape: count for shape, count in ctx["db_shapes"].items() if count > DB_REPEATED_SHAPE_THRESHOLD}
+
+# ============ METRICS ============
+
+# Prometheus text-format metrics without a client library. Each thread updates
+# its own shard (the event loop is one thread; pymongo pool events arrive on
+# Motor's executor threads), so recording never takes a lock; shards are summed
+# at scrape time.
+# /metrics requires this bearer token; without one it is refused unless METRICS_PUBLIC
+# is set (only for deployments where the port is reachable from the scraper alone)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', 'false').lower() == 'true'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+class Metric:
+    """A labelled counter, gauge or histogram with per-thread shards"""
+    
+    registry = []
+    shard_lock = threading.Lock()
+    
+    def __init__(self, name: str, help_text: str, metric_type: str, label_names: tuple = (), buckets: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.metric_type = metric_type
+        self.label_names = label_names
+        self.buckets = buckets
+        self.shards = {}  # thread id -> {label values: value or [bucket counts..., +Inf count, sum, count]}
+        Metric.registry.append(self)
+    
+    def _shard(self) -> dict:
+        ident = threading.get_ident()
+        shard = self.shards.get(ident)
+        if shard is None:
+            with Metric.shard_lock:
+                shard = self.shards.setdefault(ident, {})
+        return shard
+    
+    def inc(self, *labels, amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+    
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+    
+    def observe(self, value: float, *labels):
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            state = shard[labels] = [0] * (len(self.buckets) + 3)
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-2] += value
+        state[-1] += 1
+    
+    def collect(self) -> dict:
+        totals = {}
+        for shard in list(self.shards.values()):
+            for labels, value in list(shard.items()):
+                if self.buckets:
+                    merged = totals.setdefault(labels, [0] * (len(self.buckets) + 3))
+                    for i, v in enumerate(value):
+                        merged[i] += v
+                else:
+                    totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+class CallbackGauge:
+    """Gauge read at scrape time from fn() -> {label values: value}"""
+    
+    def __init__(self, name: str, help_text: str, label_names: tuple, fn):
+        self.name = name
+        self.help_text = help_text
+        self.metric_type = "gauge"
+        self.label_names = label_names
+        self.buckets = ()
+        self.fn = fn
+        Metric.registry.append(self)
+    
+    def collect(self) -> dict:
+        try:
+            return self.fn()
+        except Exception:
+            return {}
+
+def escape_label_value(value) -> str:
+    """Escape a label value as the text exposition format requires: backslash, quote, newline"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label_value(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def render_metrics() -> str:
+    lines = []
+    for metric in Metric.registry:
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+        for labels, value in sorted(metric.collect().items()):
+            if not metric.buckets:
+                lines.append(f"{metric.name}{format_labels(metric.label_names, labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + ("+Inf",), value):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{metric.name}_bucket{format_labels(metric.label_names, labels, le)} {cumulative}")
+            lines.append(f"{metric.name}_sum{format_labels(metric.label_names, labels)} {value[-2]}")
+            lines.append(f"{metric.name}_count{format_labels(metric.label_names, labels)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+http_request_duration = Metric(
+    "http_request_duration_seconds", "Request latency by route template", "histogram",
+    ("method", "route"), LATENCY_BUCKETS
+)
+http_requests_total = Metric("http_requests_total", "Requests by route template and status", "counter",
+                             ("method", "route", "status"))
+http_requests_in_flight = Metric("http_requests_in_flight", "Requests currently being served", "gauge", ("method",))
+mongo_pool_wait = Metric(
+    "mongo_pool_checkout_wait_seconds", "Time spent waiting for a MongoDB pool connection", "histogram",
+    ("address",), POOL_WAIT_BUCKETS
+)
+mongo_pool_checkout_failures = Metric("mongo_pool_checkout_failures_total", "Failed pool checkouts", "counter",
+                                      ("address", "reason"))
+cache_requests = Metric("cache_requests_total", "Cache lookups by result", "counter", ("cache", "result"))
+
+def record_cache(cache: str, hit: bool):
+    cache_requests.inc(cache, "hit" if hit else "miss")
+
+class PoolWaitListener(monitoring.ConnectionPoolListener):
+    """Time connection checkouts; started/finished events fire on the same thread"""
+    
+    checkout_started_at = threading.local()
+    
+    def connection_check_out_started(self, event):
+        self.checkout_started_at.value = time.perf_counter()
+    
+    def connection_checked_out(self, event):
+        started = getattr(self.checkout_started_at, "value", None)
+        if started is not None:
+            mongo_pool_wait.observe(time.perf_counter() - started, f"{event.address[0]}:{event.address[1]}")
+    
+    def connection_check_out_failed(self, event):
+        mongo_pool_checkout_failures.inc(f"{event.address[0]}:{event.address[1]}", str(event.reason))
+    
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_checked_in(self, event): pass
+
+# ============ EVENT LOOP MONITOR ============
+
+# A coroutine wakes every LOOP_MONITOR_INTERVAL_SECONDS and records how late it
+# ran (scheduling lag). A watchdog thread watches its heartbeat; when the loop
+# has been stuck for LOOP_BLOCK_THRESHOLD_SECONDS it logs the loop thread's
+# stack, which points at the code that is blocking. LOOP_BLOCKING_STRICT times
+# every loop callback and fails requests whose code held the loop for longer
+# than LOOP_BLOCKING_BUDGET_SECONDS (meant for test runs; adds overhead).
+LOOP_MONITOR_ENABLED = os.environ.get('LOOP_MONITOR_ENABLED', 'true').lower() == 'true'
+LOOP_MONITOR_INTERVAL_SECONDS = float(os.environ.get('LOOP_MONITOR_INTERVAL_SECONDS', '0.1'))
+LOOP_BLOCK_THRESHOLD_SECONDS = float(os.environ.get('LOOP_BLOCK_THRESHOLD_SECONDS', '0.25'))
+LOOP_BLOCKING_STRICT = os.environ.get('LOOP_BLOCKING_STRICT', 'false').lower() == 'true'
+LOOP_BLOCKING_BUDGET_SECONDS = float(os.environ.get('LOOP_BLOCKING_BUDGET_SECONDS', '0.05'))
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+event_loop_lag = Metric("event_loop_lag_seconds", "Event loop scheduling lag", "histogram", (), LAG_BUCKETS)
+event_loop_blocked = Metric("event_loop_blocked_total", "Stalls longer than LOOP_BLOCK_THRESHOLD_SECONDS", "counter")
+loop_heartbeat = {"at": time.monotonic(), "thread_id": None}
+
+async def monitor_event_loop():
+    """Measure how late the loop wakes us up"""
+    loop_heartbeat["thread_id"] = threading.get_ident()
+    while True:
+        expected = time.monotonic() + LOOP_MONITOR_INTERVAL_SECONDS
+        loop_heartbeat["at"] = time.monotonic()
+        await asyncio.sleep(LOOP_MONITOR_INTERVAL_SECONDS)
+        event_loop_lag.observe(max(0.0, time.monotonic() - expected))
+
+def watch_loop_heartbeat(stop: threading.Event):
+    """Watchdog thread: log the loop thread's stack once per stall"""
+    reported_beat = None
+    while not stop.wait(LOOP_BLOCK_THRESHOLD_SECONDS / 2):
+        beat = loop_heartbeat["at"]
+        stalled = time.monotonic() - beat - LOOP_MONITOR_INTERVAL_SECONDS
+        if stalled < LOOP_BLOCK_THRESHOLD_SECONDS or beat == reported_beat:
+            continue
+        reported_beat = beat
+        event_loop_blocked.inc()
+        frame = sys._current_frames().get(loop_heartbeat["thread_id"])
+        stack = "".join(traceback.format_stack(frame)) if frame else ""
+        logger.warning(f"Event loop blocked for over {stalled:.3f}s", extra={"fields": {
+            "blocked_seconds": round(stalled, 3),
+            "stack": stack,
+        }})
+
+def install_blocking_detector():
+    """Time every loop callback and charge it to the request whose context it ran in"""
+    original_run = asyncio.events.Handle._run
+    if getattr(original_run, "blocking_detector", False):
+        return
+    
+    def timed_run(handle):
+        start = time.perf_counter()
+        original_run(handle)
+        elapsed = time.perf_counter() - start
+        if elapsed > LOOP_BLOCKING_BUDGET_SECONDS:
+            ctx = handle._context.run(request_context.get)
+            if ctx is not None:
+                ctx["loop_blocked_seconds"] = max(ctx.get("loop_blocked_seconds", 0.0), elapsed)
+    
+    timed_run.blocking_detector = True
+    asyncio.events.Handle._run = timed_run
+
+loop_watchdog_stop = threading.Event()
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[DbCommandProfiler(), PoolWaitListener()])
 db = client[os.environ['DB_NAME']]
 
+async def upsert_with_retry(operation):
+    """Run an upsert; if a concurrent upsert inserted the same unique key first, retry once as an update"""
+    try:
+        return await operation()
+    except DuplicateKeyError:
+        return await operation()
+
 # JWT Configuration
 JWT_SECRET = os.environ.get('JWT_SECRET', 'paperboy-prince-secret-key-2024')
 JWT_ALGORITHM = "HS256"
@@ -62,25 +426,227 @@ security = HTTPBearer()
 # Mount static files for uploads
 app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
 
+# ============ RESPONSE COMPRESSION ============
+
+# Text-like responses of at least COMPRESSION_MIN_BYTES are sent with Brotli or
+# gzip, whichever the client prefers (Brotli needs the optional brotli package).
+# Anonymous GETs of PUBLIC_CACHE_PATHS are additionally kept for a few seconds in
+# a cache that stores every encoding up front, so compression is paid once per
+# cache fill instead of once per request. Streaming responses pass through as-is.
+# The middleware is registered first so it runs innermost: logging, metrics and
+# CORS still see every request, including cache hits. Write handlers drop the
+# paths they affect with invalidate_public_cache (in this worker; other workers
+# catch up within PUBLIC_CACHE_TTL_SECONDS).
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+COMPRESSION_THREAD_BYTES = 64 * 1024  # Larger bodies are compressed off the event loop
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', '5'))
+CACHED_GZIP_LEVEL = 9
+CACHED_BROTLI_QUALITY = int(os.environ.get('CACHED_BROTLI_QUALITY', '9'))
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+PUBLIC_CACHE_TTL_SECONDS = float(os.environ.get('PUBLIC_CACHE_TTL_SECONDS', '5'))
+PUBLIC_CACHE_MAX_ENTRIES = int(os.environ.get('PUBLIC_CACHE_MAX_ENTRIES', '512'))
+PUBLIC_CACHE_PATHS = {
+    p.strip() for p in os.environ.get(
+        'PUBLIC_CACHE_PATHS', '/api/posts,/api/posts/latest,/api/events,/api/actions,/api/products'
+    ).split(',') if p.strip()
+}
+
+public_response_cache = OrderedDict()  # (path, query string) -> entry
+public_cache_generations = {}  # path -> invalidation count; a fill that straddles one isn't stored
+POST_CACHE_PATHS = ("/api/posts", "/api/posts/latest")
+
+def invalidate_public_cache(*paths: str):
+    """Drop cached public responses for `paths` after a write that changes them"""
+    for path in paths:
+        public_cache_generations[path] = public_cache_generations.get(path, 0) + 1
+    for key in [key for key in public_response_cache if key[0] in paths]:
+        del public_response_cache[key]
+
+def negotiate_encoding(accept_encoding: str) -> str:
+    """Pick br or gzip from an Accept-Encoding header (highest q wins, br on ties), else identity"""
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+    
+    best, best_q = "identity", 0.0
+    for encoding in ("br", "gzip") if brotli is not None else ("gzip",):
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+def compress_body(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=CACHED_BROTLI_QUALITY if cached else BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=CACHED_GZIP_LEVEL if cached else GZIP_LEVEL, mtime=0)
+
+async def compress_async(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    if len(body) >= COMPRESSION_THREAD_BYTES:
+        return await asyncio.to_thread(compress_body, body, encoding, cached)
+    return compress_body(body, encoding, cached)
+
+def is_compressible(status: int, headers: Headers, body: bytes) -> bool:
+    return (
+        status not in (204, 304)
+        and len(body) >= COMPRESSION_MIN_BYTES
+        and "content-encoding" not in headers
+        and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+    )
+
+async def send_with_encoding(send, start: dict, body: bytes, encoding: str, compressed: bytes = None,
+                             vary: bool = True):
+    """Send a complete response, encoded with `encoding` (using `compressed` if already done)"""
+    headers = MutableHeaders(raw=list(start["headers"]))
+    if encoding != "identity":
+        if compressed is None:
+            compressed = await compress_async(body, encoding)
+        body = compressed
+        headers["Content-Encoding"] = encoding
+    if vary:
+        headers.add_vary_header("Accept-Encoding")
+    headers["Content-Length"] = str(len(body))
+    await send({**start, "headers": headers.raw})
+    await send({"type": "http.response.body", "body": body})
+
+class CompressionMiddleware:
+    """Negotiated gzip/Brotli compression plus a precompressed cache for public GETs"""
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        headers = Headers(scope=scope)
+        encoding = negotiate_encoding(headers.get("accept-encoding", ""))
+        if (PUBLIC_CACHE_TTL_SECONDS > 0 and scope["method"] == "GET"
+                and scope["path"] in PUBLIC_CACHE_PATHS and "authorization" not in headers):
+            await self.serve_cached(scope, receive, send, encoding)
+            return
+        
+        start = None
+        
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                response_headers = Headers(raw=message["headers"])
+                if ("content-encoding" in response_headers
+                        or not response_headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)):
+                    await send(message)  # Event streams, files and images go out untouched
+                    return
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+            pending, start = start, None
+            body = message.get("body", b"")
+            if message.get("more_body") or not is_compressible(
+                    pending["status"], Headers(raw=pending["headers"]), body):
+                await send(pending)
+                await send(message)
+                return
+            await send_with_encoding(send, pending, body, encoding)
+        
+        await self.app(scope, receive, send_compressed)
+    
+    async def serve_cached(self, scope, receive, send, encoding: str):
+        key = (scope["path"], scope["query_string"])
+        entry = public_response_cache.get(key)
+        hit = entry is not None and entry["expires_at"] > time.monotonic()
+        record_cache("public_response", hit)
+        if hit:
+            public_response_cache.move_to_end(key)
+            scope["route"] = entry["route"]  # Keeps the route label on metrics and logs
+        else:
+            messages = []
+            generation = public_cache_generations.get(scope["path"], 0)
+            
+            async def capture(message):
+                messages.append(message)
+            
+            await self.app(scope, receive, capture)
+            start = messages[0]
+            body = b"".join(m.get("body", b"") for m in messages[1:] if m["type"] == "http.response.body")
+            response_headers = Headers(raw=start["headers"])
+            if (start["status"] != 200 or "set-cookie" in response_headers
+                    or public_cache_generations.get(scope["path"], 0) != generation):
+                compressible = is_compressible(start["status"], response_headers, body)
+                await send_with_encoding(send, start, body, encoding if compressible else "identity",
+                                         vary=compressible)
+                return
+            
+            variants = {"identity": body}
+            if is_compressible(start["status"], response_headers, body):
+                for name in ("br", "gzip") if brotli is not None else ("gzip",):
+                    variants[name] = await compress_async(body, name, cached=True)
+            entry = {
+                "start": {**start, "headers": [(k, v) for k, v in start["headers"] if k != b"content-length"]},
+                "variants": variants,
+                "route": scope.get("route"),
+                "expires_at": time.monotonic() + PUBLIC_CACHE_TTL_SECONDS,
+            }
+            public_response_cache[key] = entry
+            public_response_cache.move_to_end(key)
+            while len(public_response_cache) > PUBLIC_CACHE_MAX_ENTRIES:
+                public_response_cache.popitem(last=False)
+        
+        variants = entry["variants"]
+        if encoding not in variants:
+            encoding = "identity"
+        await send_with_encoding(send, entry["start"], variants["identity"], encoding, variants.get(encoding),
+                                 vary=len(variants) > 1)
+
+app.add_middleware(CompressionMiddleware)
+
 # ============ REQUEST LOGGING MIDDLEWARE ============
+def route_template(request: Request) -> str:
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or request.url.path
+
+def record_request_metrics(request: Request, status_code: int, duration: float):
+    # Unmatched paths share one label so 404 scans can't blow up cardinality
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    http_requests_in_flight.dec(request.method)
+    http_request_duration.observe(duration, request.method, route)
+    http_requests_total.inc(request.method, route, str(status_code))
+
+def request_log_fields(request: Request, ctx: dict, status_code: int, duration: float) -> dict:
+    return {
+        "request_id": ctx["request_id"],
+        "method": request.method,
+        "route": route_template(request),
+        "status": status_code,
+        "duration_ms": round(duration * 1000, 1),
+        "db_calls": ctx["db_calls"],
+        "db_time_ms": round(ctx["db_seconds"] * 1000, 1),
+    }
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
+    """Log one structured line per request; successes are sampled"""
     request_id = str(uuid.uuid4())[:8]
-    start_time = time.time()
-    
-    # Log request
-    logger.info(f"[{request_id}] {request.method} {request.url.path} - Started")
+    ctx = new_request_context(request_id)
+    request_context.set(ctx)
+    start_time = time.perf_counter()
+    http_requests_in_flight.inc(request.method)
     
     try:
         response = await call_next(request)
-        duration = time.time() - start_time
-        logger.info(f"[{request_id}] {request.method} {request.url.path} - {response.status_code} ({duration:.3f}s)")
-        response.headers["X-Request-ID"] = request_id
-        return response
-    except Exception as e:
-        duration = time.time() - start_time
-        logger.error(f"[{request_id}] {request.method} {request.url.path} - ERROR: {str(e)} ({duration:.3f}s)")
-        logger.error(traceback.format_exc())
+    except Exception:
+        duration = time.perf_counter() - start_time
+        record_request_metrics(request, 500, duration)
+        logger.exception("request failed", extra={"fields": request_log_fields(request, ctx, 500, duration)})
         return JSONResponse(
             status_code=500,
             content={
@@ -89,6 +655,38 @@ async def log_requests(request: Request, call_next):
             },
             headers={"X-Request-ID": request_id}
         )
+    
+    duration = time.perf_counter() - start_time
+    blocked = ctx.get("loop_blocked_seconds")
+    if blocked:
+        logger.error(f"{request.method} {route_template(request)} blocked the event loop for {blocked:.3f}s",
+                     extra={"fields": request_log_fields(request, ctx, 500, duration)})
+        response = JSONResponse(
+            status_code=500,
+            content={
+                "detail": f"Request blocked the event loop for {blocked * 1000:.0f}ms "
+                          f"(budget {LOOP_BLOCKING_BUDGET_SECONDS * 1000:.0f}ms)",
+                "request_id": request_id,
+            }
+        )
+    record_request_metrics(request, response.status_code, duration)
+    response.headers["X-Request-ID"] = request_id
+    if DB_PROFILE_HEADERS:
+        response.headers["X-DB-Queries"] = str(ctx["db_calls"])
+        response.headers["X-DB-Time"] = f"{ctx['db_seconds'] * 1000:.1f}ms"
+    
+    repeated = repeated_db_shapes(ctx)
+    if blocked:
+        pass  # already logged above
+    elif repeated:
+        fields = request_log_fields(request, ctx, response.status_code, duration)
+        fields["repeated_shapes"] = repeated
+        logger.warning(f"Possible N+1: {request.method} {fields['route']} repeated a query shape", extra={"fields": fields})
+    elif (response.status_code >= 400 or duration >= LOG_SLOW_REQUEST_SECONDS
+            or random.random() < LOG_SUCCESS_SAMPLE_RATE):
+        fields = request_log_fields(request, ctx, response.status_code, duration)
+        logger.info(f"{request.method} {fields['route']} {response.status_code}", extra={"fields": fields})
+    return response
 
 # ============ MODELS ============
 
@@ -164,6 +762,8 @@ class PostResponse(BaseModel):
     rejection_reason: Optional[str] = None
     reviewed_by: Optional[str] = None
     reviewed_at: Optional[str] = None
+    excerpt: Optional[str] = None
+    reading_time: Optional[int] = None  # Minutes
     created_at: str
     updated_at: str
 
@@ -370,6 +970,61 @@ class CartResponse(BaseModel):
     items: List[CartItemResponse]
     total: float
 
+# ============ FAST JSON RESPONSES ============
+
+# Big list routes hand FastAPI plain documents straight from MongoDB, which it
+# re-validates against response_model and encodes with the stdlib json module.
+# With FAST_JSON_RESPONSES=true those routes return a FastJSONResponse instead:
+# documents are only projected onto the model's fields (we wrote them, so they
+# are trusted) and encoded with orjson. response_model stays on the route for
+# the OpenAPI schema; FastAPI skips it when a Response is returned.
+FAST_JSON_RESPONSES = os.environ.get('FAST_JSON_RESPONSES', 'false').lower() == 'true'
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson, falling back to the standard encoder"""
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            try:
+                return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+            except TypeError:
+                pass  # Types orjson does not know (e.g. ObjectId)
+        return super().render(jsonable_encoder(content))
+
+response_model_fields = {}
+
+def trusted_documents(docs: list, model) -> list:
+    """Project trusted documents onto a response model's fields without validating them"""
+    fields = response_model_fields.get(model)
+    if fields is None:
+        fields = [
+            (name, info.is_required(), None if info.is_required() else info.get_default(call_default_factory=True))
+            for name, info in model.model_fields.items()
+        ]
+        response_model_fields[model] = fields
+    
+    projected = []
+    for doc in docs:
+        item = {}
+        for name, required, default in fields:
+            if name in doc:
+                item[name] = doc[name]
+            elif required:
+                # Not what we expected: let the model raise its usual validation error
+                item = model.model_validate(doc).model_dump(mode="json")
+                break
+            else:
+                item[name] = default
+        projected.append(item)
+    return projected
+
+def fast_response(content, model=None):
+    """Return content through the fast JSON path when enabled, else unchanged"""
+    if not FAST_JSON_RESPONSES:
+        return content
+    if model is not None:
+        content = trusted_documents(content, model)
+    return FastJSONResponse(content)
+
 # ============ AUTH HELPERS ============
 
 def hash_password(password: str) -> str:
@@ -378,28 +1033,63 @@ def hash_password(password: str) -> str:
 def verify_password(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
-def create_token(user_id: str, email: str, is_admin: bool) -> str:
+# Verified tokens are cached by digest until they expire, so repeat requests skip
+# the HMAC check. Revocation is a per-user generation number carried in the token
+# ("gen") and compared with the user document get_current_user already loads.
+TOKEN_CACHE_MAX = int(os.environ.get('TOKEN_CACHE_MAX', '10000'))
+token_cache = OrderedDict()  # sha256(token) -> (payload, exp)
+
+def create_token(user_id: str, email: str, is_admin: bool, generation: int = 0) -> str:
     payload = {
         "user_id": user_id,
         "email": email,
         "is_admin": is_admin,
+        "gen": generation,
         "exp": datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 def decode_token(token: str) -> dict:
+    digest = hashlib.sha256(token.encode('utf-8')).digest()
+    cached = token_cache.get(digest)
+    if cached:
+        if cached[1] > time.time():
+            token_cache.move_to_end(digest)
+            record_cache("token", True)
+            return cached[0]
+        del token_cache[digest]
+    record_cache("token", False)
     try:
-        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    if "exp" in payload:
+        token_cache[digest] = (payload, payload["exp"])
+        if len(token_cache) > TOKEN_CACHE_MAX:
+            token_cache.popitem(last=False)
+    return payload
+
+def token_generation(user: dict) -> int:
+    return user.get("token_generation", 0)
+
+async def revoke_user_tokens(user_id: str, extra_set: Optional[dict] = None) -> Optional[dict]:
+    """Invalidate every token issued to a user so far. Returns the updated user."""
+    update = {"$inc": {"token_generation": 1}}
+    if extra_set:
+        update["$set"] = extra_set
+    return await db.users.find_one_and_update(
+        {"id": user_id}, update, projection={"_id": 0}, return_document=ReturnDocument.AFTER
+    )
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     payload = decode_token(credentials.credentials)
     user = await db.users.find_one({"id": payload["user_id"]}, {"_id": 0})
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
+    if payload.get("gen", 0) != token_generation(user):
+        raise HTTPException(status_code=401, detail="Token revoked")
     return user
 
 async def get_admin_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
@@ -409,19 +1099,239 @@ async def get_admin_user(credentials: HTTPAuthorizationCredentials = Depends(sec
     return user
 
 # ============ RATE LIMITING ============
-rate_limit_store = defaultdict(list)
+
+# Token buckets: a key holds at most `limit` tokens, refilled at limit/window
+# per second, so it allows `limit` requests per window with bursts up to
+# `limit`. State is fixed-size per key. The in-memory backend caps the number
+# of keys (LRU) and drops buckets once they have refilled; the Mongo backend
+# shares buckets between uvicorn workers and expires them with a TTL index.
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory').lower()  # memory, mongo
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', '100000'))
+# X-Forwarded-For is client-controlled; only enable this behind a proxy that appends
+# to it. Each of the TRUSTED_PROXY_HOPS proxies appends one entry, so the client is
+# the entry that many places from the right - anything further left can be forged.
+TRUST_FORWARDED_FOR = os.environ.get('TRUST_FORWARDED_FOR', 'false').lower() == 'true'
+TRUSTED_PROXY_HOPS = max(1, int(os.environ.get('TRUSTED_PROXY_HOPS', '1')))
 RATE_LIMIT_WINDOW = 60  # seconds
 RATE_LIMIT_MAX_REQUESTS = 5  # max reset requests per window
+COMMENT_RATE_LIMIT_SECONDS = 15
 
-def check_rate_limit(key: str) -> bool:
-    """Check if action is rate limited. Returns True if allowed, False if blocked."""
-    now = time.time()
-    # Clean old entries
-    rate_limit_store[key] = [t for t in rate_limit_store[key] if now - t < RATE_LIMIT_WINDOW]
-    if len(rate_limit_store[key]) >= RATE_LIMIT_MAX_REQUESTS:
-        return False
-    rate_limit_store[key].append(now)
-    return True
+class InMemoryRateLimitBackend:
+    """Per-process token buckets in a bounded LRU map"""
+    
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()  # key -> (tokens, updated_at, full_at)
+    
+    async def hit(self, key: str, limit: int, window_seconds: float) -> tuple[bool, float]:
+        """Take one token. Returns (allowed, seconds until a token is available)."""
+        now = time.monotonic()
+        rate = limit / window_seconds
+        bucket = self.buckets.pop(key, None)
+        tokens = float(limit) if bucket is None else min(limit, bucket[0] + (now - bucket[1]) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self.buckets[key] = (tokens, now, now + (limit - tokens) / rate)
+        
+        # A bucket that has refilled is the same as no bucket, so expire it from the LRU end
+        while self.buckets:
+            oldest_key, oldest = next(iter(self.buckets.items()))
+            if oldest[2] > now and len(self.buckets) <= self.max_keys:
+                break
+            del self.buckets[oldest_key]
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+    
+    async def reset(self, key: str):
+        self.buckets.pop(key, None)
+
+class MongoRateLimitBackend:
+    """Token buckets shared by all workers; one atomic pipeline update per hit"""
+    
+    def __init__(self, collection):
+        self.collection = collection
+    
+    async def hit(self, key: str, limit: int, window_seconds: float) -> tuple[bool, float]:
+        """Take one token. Returns (allowed, seconds until a token is available)."""
+        now = time.time()
+        rate = limit / window_seconds
+        elapsed = {"$max": [0, {"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}]}
+        refilled = {"$min": [limit, {"$add": [{"$ifNull": ["$tokens", limit]}, {"$multiply": [elapsed, rate]}]}]}
+        has_token = {"$gte": ["$tokens", 1]}
+        bucket = await self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled}},
+                {"$set": {
+                    "allowed": has_token,
+                    "tokens": {"$cond": [has_token, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "updated_at": now,
+                    "expires_at": datetime.fromtimestamp(now + window_seconds, timezone.utc)
+                }}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        allowed = bucket["allowed"]
+        return allowed, 0.0 if allowed else (1 - bucket["tokens"]) / rate
+    
+    async def reset(self, key: str):
+        await self.collection.delete_one({"_id": key})
+
+rate_limiter = MongoRateLimitBackend(db.rate_limits) if RATE_LIMIT_BACKEND == "mongo" else InMemoryRateLimitBackend()
+
+def client_ip(request: Request) -> str:
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        hops = [hop.strip() for hop in forwarded.split(",")] if forwarded else []
+        if len(hops) >= TRUSTED_PROXY_HOPS and hops[-TRUSTED_PROXY_HOPS]:
+            return hops[-TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else "unknown"
+
+async def current_user_id(user: dict = Depends(get_current_user)) -> str:
+    return user["id"]
+
+async def admin_user_id(admin: dict = Depends(get_admin_user)) -> str:
+    return admin["id"]
+
+async def reset_token_prefix(request: Request) -> str:
+    """Key reset attempts by token prefix (the body is already cached by FastAPI)"""
+    try:
+        body = await request.json()
+    except ValueError:
+        return "invalid"
+    return str(body.get("token", ""))[:8] if isinstance(body, dict) else "invalid"
+
+def rate_limit(scope: str, limit: int, window_seconds: float, detail: str, identify, on_blocked=None):
+    """Build a FastAPI dependency that enforces a token bucket per identity"""
+    async def dependency(request: Request, identity: str = Depends(identify)):
+        allowed, retry_after = await rate_limiter.hit(f"{scope}:{identity}", limit, window_seconds)
+        if not allowed:
+            if on_blocked:
+                await on_blocked(request, identity)
+            raise HTTPException(
+                status_code=429,
+                detail=detail,
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+    return dependency
+
+# Login throttling runs before bcrypt so that attack traffic costs a dict lookup,
+# not a password hash. Failures are counted per email and per client IP; past
+# LOGIN_FREE_FAILURES each further failure doubles the lockout. Attempts still in
+# flight count as pending failures, so a concurrent burst gets at most the
+# remaining free failures through to bcrypt (one at a time once they are used up).
+LOGIN_FREE_FAILURES = int(os.environ.get('LOGIN_FREE_FAILURES', '5'))
+LOGIN_BACKOFF_BASE_SECONDS = float(os.environ.get('LOGIN_BACKOFF_BASE_SECONDS', '1'))
+LOGIN_BACKOFF_MAX_SECONDS = float(os.environ.get('LOGIN_BACKOFF_MAX_SECONDS', '900'))
+LOGIN_FAILURE_RESET_SECONDS = float(os.environ.get('LOGIN_FAILURE_RESET_SECONDS', '3600'))
+LOGIN_IP_FREE_FAILURES = int(os.environ.get('LOGIN_IP_FREE_FAILURES', '20'))
+LOGIN_THROTTLE_MAX_KEYS = int(os.environ.get('LOGIN_THROTTLE_MAX_KEYS', '100000'))
+
+class LoginThrottle:
+    """Failure counters with exponential backoff in a bounded LRU map"""
+    
+    def __init__(self, max_keys: int = LOGIN_THROTTLE_MAX_KEYS):
+        self.max_keys = max_keys
+        self.entries = OrderedDict()  # key -> (failures, blocked_until, last_failure_at)
+        self.in_flight = {}  # key -> attempts reserved but not yet recorded
+    
+    def acquire(self, limits: dict) -> float:
+        """Reserve an attempt on every key ({key: free_failures}); returns seconds to wait instead (0 when reserved)"""
+        now = time.monotonic()
+        wait = 0.0
+        for key, free_failures in limits.items():
+            failures, blocked_until, last_failure_at = self.entries.get(key, (0, 0.0, now))
+            if now - last_failure_at > LOGIN_FAILURE_RESET_SECONDS:
+                failures = 0
+            wait = max(wait, blocked_until - now)
+            if self.in_flight.get(key, 0) >= max(1, free_failures - failures):
+                wait = max(wait, 1.0)
+        if wait > 0:
+            return wait
+        for key in limits:
+            self.in_flight[key] = self.in_flight.get(key, 0) + 1
+        return 0.0
+    
+    def release(self, keys: List[str]):
+        for key in keys:
+            remaining = self.in_flight.pop(key, 0) - 1
+            if remaining > 0:
+                self.in_flight[key] = remaining
+    
+    def record_failure(self, key: str, free_failures: int):
+        now = time.monotonic()
+        failures, _, last_failure_at = self.entries.pop(key, (0, 0.0, now))
+        if now - last_failure_at > LOGIN_FAILURE_RESET_SECONDS:
+            failures = 0
+        failures += 1
+        blocked_until = 0.0
+        if failures >= free_failures:
+            backoff = LOGIN_BACKOFF_BASE_SECONDS * 2 ** (failures - free_failures)
+            blocked_until = now + min(backoff, LOGIN_BACKOFF_MAX_SECONDS)
+        self.entries[key] = (failures, blocked_until, now)
+        
+        # Oldest failures go first: expired ones always, live ones only when over capacity
+        while self.entries:
+            oldest_key, oldest = next(iter(self.entries.items()))
+            if now - oldest[2] <= LOGIN_FAILURE_RESET_SECONDS and len(self.entries) <= self.max_keys:
+                break
+            del self.entries[oldest_key]
+    
+    def record_success(self, key: str):
+        self.entries.pop(key, None)
+
+login_throttle = LoginThrottle()
+
+def login_throttle_keys(request: Request, email: str) -> tuple[str, str]:
+    return f"email:{email.lower()}", f"ip:{client_ip(request)}"
+
+def enforce_login_throttle(request: Request, email: str) -> List[str]:
+    """Reserve a login attempt before any user lookup or password verification, or reject it.
+    Callers must pass the returned keys to login_throttle.release once the attempt is recorded."""
+    email_key, ip_key = login_throttle_keys(request, email)
+    retry_after = login_throttle.acquire({email_key: LOGIN_FREE_FAILURES, ip_key: LOGIN_IP_FREE_FAILURES})
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many failed login attempts. Please wait before trying again.",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+    return [email_key, ip_key]
+
+def record_login_failure(request: Request, email: str):
+    email_key, ip_key = login_throttle_keys(request, email)
+    login_throttle.record_failure(email_key, LOGIN_FREE_FAILURES)
+    login_throttle.record_failure(ip_key, LOGIN_IP_FREE_FAILURES)
+
+def record_login_success(request: Request, email: str):
+    email_key, _ = login_throttle_keys(request, email)
+    login_throttle.record_success(email_key)
+
+async def audit_blocked_admin_reset(request: Request, admin_id: str):
+    admin = await db.users.find_one({"id": admin_id}, {"_id": 0, "email": 1})
+    await create_audit_log(
+        action="password_reset_request",
+        admin_id=admin_id,
+        admin_email=admin["email"] if admin else "",
+        target_user_id=request.path_params.get("user_id"),
+        details="Rate limited",
+        outcome="blocked"
+    )
+
+reset_password_rate_limit = rate_limit(
+    "reset", RATE_LIMIT_MAX_REQUESTS, RATE_LIMIT_WINDOW,
+    "Too many attempts. Please wait before trying again.", reset_token_prefix
+)
+comment_rate_limit = rate_limit(
+    "comment", 1, COMMENT_RATE_LIMIT_SECONDS,
+    f"Please wait {COMMENT_RATE_LIMIT_SECONDS} seconds between comments", current_user_id
+)
+admin_reset_rate_limit = rate_limit(
+    "admin_reset", RATE_LIMIT_MAX_REQUESTS, RATE_LIMIT_WINDOW,
+    "Too many reset requests. Please wait before trying again.", admin_user_id,
+    on_blocked=audit_blocked_admin_reset
+)
 
 # ============ RESET TOKEN HELPERS ============
 RESET_TOKEN_EXPIRY_MINUTES = 60
@@ -471,15 +1381,216 @@ def validate_password(password: str) -> tuple[bool, str]:
         return False, "Password must contain at least one special character"
     return True, ""
 
+# ============ NOTIFICATION COUNTERS ============
+
+# Unread counts are kept in notification_counters ({admin_id, unread, version})
+# and adjusted atomically by every write that changes read state, so the badge
+# never needs a count_documents over the notifications collection. Only existing
+# counters are adjusted; a missing one is seeded from count_documents on first
+# read. A periodic reconciler compares every counter with count_documents and
+# corrects drift (e.g. a write landing while a counter was being seeded),
+# compare-and-set on `version` so it never overwrites a concurrent adjustment.
+NOTIFICATION_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_DAYS', '30'))
+NOTIFICATION_COMPACT_INTERVAL_HOURS = 6
+NOTIFICATION_COMPACT_BATCH_SIZE = 1000
+NOTIFICATION_COUNTER_RECONCILE_MINUTES = float(os.environ.get('NOTIFICATION_COUNTER_RECONCILE_MINUTES', '15'))
+
+async def initialize_notification_counter(admin_id: str) -> int:
+    """Seed a missing counter from the notifications collection"""
+    count = await db.notifications.count_documents({"recipient_admin_id": admin_id, "read_at": None})
+    try:
+        await db.notification_counters.update_one(
+            {"admin_id": admin_id},
+            {"$setOnInsert": {"unread": count, "version": 0}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        pass
+    counter = await db.notification_counters.find_one({"admin_id": admin_id}, {"_id": 0, "unread": 1})
+    return counter["unread"] if counter else count
+
+async def count_unread_notifications(admin_id: str) -> int:
+    counter = await db.notification_counters.find_one({"admin_id": admin_id}, {"_id": 0, "unread": 1})
+    if counter is None:
+        return max(0, await initialize_notification_counter(admin_id))
+    return max(0, counter["unread"])
+
+async def adjust_unread_counters(deltas: dict):
+    """Apply {admin_id: delta} to existing unread counters in one round trip"""
+    # No upsert: creating a counter at the delta would skip the count_documents seed
+    operations = [
+        UpdateOne({"admin_id": admin_id}, {"$inc": {"unread": delta, "version": 1}})
+        for admin_id, delta in deltas.items() if delta
+    ]
+    if operations:
+        await db.notification_counters.bulk_write(operations, ordered=False)
+
+async def reconcile_notification_counter(admin_id: str) -> bool:
+    """Reset an admin's counter to the real unread count; returns True if it had drifted"""
+    counter = await db.notification_counters.find_one({"admin_id": admin_id}, {"_id": 0, "unread": 1, "version": 1})
+    if counter is None:
+        await initialize_notification_counter(admin_id)
+        return False
+    count = await db.notifications.count_documents({"recipient_admin_id": admin_id, "read_at": None})
+    if counter["unread"] == count:
+        return False
+    # Counters written before versioning have no version field; {"version": None} matches those
+    result = await db.notification_counters.update_one(
+        {"admin_id": admin_id, "version": counter.get("version")},
+        {"$set": {"unread": count}, "$inc": {"version": 1}}
+    )
+    if not result.modified_count:
+        return False  # Adjusted while we were counting; the next pass checks again
+    logger.warning(f"Unread counter for admin {admin_id} drifted: {counter['unread']} -> {count}")
+    await push_notification_update(admin_id)
+    return True
+
+async def run_notification_counter_reconciler():
+    """Background job: seed missing counters and correct drifted ones for every admin"""
+    while True:
+        try:
+            for admin in await get_admin_roster():
+                await reconcile_notification_counter(admin["id"])
+        except Exception as e:
+            logger.error(f"Notification counter reconciliation failed: {str(e)}")
+        await asyncio.sleep(NOTIFICATION_COUNTER_RECONCILE_MINUTES * 60)
+
+async def compact_notifications(retention_days: int = NOTIFICATION_RETENTION_DAYS) -> int:
+    """Move read notifications older than the retention period to notifications_archive"""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).isoformat()
+    moved = 0
+    while True:
+        batch = await db.notifications.find(
+            {"read_at": {"$ne": None, "$lt": cutoff}}, {"_id": 0}
+        ).limit(NOTIFICATION_COMPACT_BATCH_SIZE).to_list(NOTIFICATION_COMPACT_BATCH_SIZE)
+        if not batch:
+            break
+        # Archive first so a crash can only leave a duplicate, never lose a notification
+        await db.notifications_archive.bulk_write(
+            [UpdateOne({"id": n["id"]}, {"$setOnInsert": n}, upsert=True) for n in batch],
+            ordered=False
+        )
+        await db.notifications.delete_many({"id": {"$in": [n["id"] for n in batch]}})
+        moved += len(batch)
+    if moved:
+        logger.info(f"Archived {moved} read notifications older than {retention_days} days")
+    return moved
+
+async def run_notification_compactor():
+    """Background lifecycle job for read notifications"""
+    while True:
+        try:
+            await compact_notifications()
+        except Exception as e:
+            logger.error(f"Notification compaction failed: {str(e)}")
+        await asyncio.sleep(NOTIFICATION_COMPACT_INTERVAL_HOURS * 3600)
+
+# ============ NOTIFICATION STREAMING ============
+
+# Admin UIs subscribe to /notifications/stream (Server-Sent Events) instead of
+# polling. Updates are fanned out through an in-process broker; with several
+# uvicorn workers set NOTIFICATIONS_CHANGE_STREAM=true so every worker feeds
+# its broker from a Mongo change stream (requires a replica set).
+NOTIFICATIONS_CHANGE_STREAM = os.environ.get('NOTIFICATIONS_CHANGE_STREAM', 'false').lower() == 'true'
+NOTIFICATION_STREAM_QUEUE_SIZE = 100
+NOTIFICATION_STREAM_HEARTBEAT_SECONDS = 15
+# EventSource can't send headers, so browsers open the stream with a short-lived,
+# single-use ticket instead of putting the JWT in a URL that access logs record
+NOTIFICATION_STREAM_TICKET_SECONDS = 30
+
+class NotificationBroker:
+    """In-process pub/sub of notification events keyed by admin id"""
+    
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+    
+    def subscribe(self, admin_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=NOTIFICATION_STREAM_QUEUE_SIZE)
+        self.subscribers[admin_id].add(queue)
+        return queue
+    
+    def unsubscribe(self, admin_id: str, queue: asyncio.Queue):
+        queues = self.subscribers.get(admin_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[admin_id]
+    
+    def has_subscribers(self, admin_id: str) -> bool:
+        return admin_id in self.subscribers
+    
+    def publish(self, admin_id: str, event: dict):
+        for queue in self.subscribers.get(admin_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow client: drop its backlog and tell it to refetch over REST
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync"})
+
+notification_broker = NotificationBroker()
+
+async def push_notification_update(admin_id: str, notification: Optional[dict] = None):
+    """Push a new notification and the fresh unread count to an admin's open streams"""
+    if not notification_broker.has_subscribers(admin_id):
+        return
+    if notification:
+        notification_broker.publish(admin_id, {
+            "type": "notification",
+            "notification": {k: v for k, v in notification.items() if k != "_id"}
+        })
+    count = await count_unread_notifications(admin_id)
+    notification_broker.publish(admin_id, {"type": "unread_count", "unread_count": count})
+
+async def watch_notification_changes():
+    """Feed the local broker from a Mongo change stream (multi-worker deployments)"""
+    pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+    while True:
+        try:
+            async with db.notifications.watch(pipeline, full_document="updateLookup") as stream:
+                async for change in stream:
+                    doc = change.get("fullDocument")
+                    if not doc:
+                        continue
+                    is_new = change["operationType"] == "insert"
+                    await push_notification_update(doc["recipient_admin_id"], doc if is_new else None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Notification change stream failed, retrying: {str(e)}")
+            await asyncio.sleep(5)
+
 # ============ NOTIFICATION HELPERS ============
 
+# Admin roster cache: submission fan-out reads the list of admins on every
+# post/action, so keep it in memory and refresh it at most once per TTL.
+ADMIN_ROSTER_TTL_SECONDS = 60
+admin_roster_cache = {"admins": None, "loaded_at": 0.0}
+
+async def get_admin_roster() -> list:
+    """Return [{id, email}] for all admins, cached for ADMIN_ROSTER_TTL_SECONDS"""
+    stale = admin_roster_cache["admins"] is None or time.time() - admin_roster_cache["loaded_at"] > ADMIN_ROSTER_TTL_SECONDS
+    record_cache("admin_roster", not stale)
+    if stale:
+        admin_roster_cache["admins"] = await db.users.find(
+            {"is_admin": True}, {"_id": 0, "id": 1, "email": 1}
+        ).to_list(100)
+        admin_roster_cache["loaded_at"] = time.time()
+    return admin_roster_cache["admins"]
+
+def invalidate_admin_roster():
+    admin_roster_cache["admins"] = None
+
 async def create_admin_notifications(entity_type: str, entity_id: str, entity_title: str, author_name: str):
     """Create in-app notifications for all admins when content is submitted"""
-    admins = await db.users.find({"is_admin": True}, {"_id": 0, "id": 1, "email": 1}).to_list(100)
+    admins = await get_admin_roster()
+    if not admins:
+        return 0
     now = datetime.now(timezone.utc).isoformat()
     
-    for admin in admins:
-        notification_doc = {
+    notification_docs = [
+        {
             "id": str(uuid.uuid4()),
             "recipient_admin_id": admin["id"],
             "notification_type": f"new_{entity_type}",
@@ -489,43 +1600,392 @@ async def create_admin_notifications(entity_type: str, entity_id: str, entity_ti
             "created_at": now,
             "read_at": None
         }
-        await db.notifications.insert_one(notification_doc)
+        for admin in admins
+    ]
+    duplicates = set()
+    try:
+        await db.notifications.insert_many(notification_docs, ordered=False)
+    except BulkWriteError as e:
+        # A retried job re-notifies; the unique index drops admins already notified
+        write_errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != 11000 for err in write_errors):
+            raise
+        duplicates = {err["index"] for err in write_errors}
+    notification_docs = [doc for i, doc in enumerate(notification_docs) if i not in duplicates]
+    await adjust_unread_counters({doc["recipient_admin_id"]: 1 for doc in notification_docs})
+    
+    if not NOTIFICATIONS_CHANGE_STREAM:
+        for notification_doc in notification_docs:
+            await push_notification_update(notification_doc["recipient_admin_id"], notification_doc)
     
     return len(admins)
 
-async def log_email_attempt(to_email: str, template_type: str, entity_type: str, entity_id: str, 
-                           email_status: str, error: str = None):
-    """Log email delivery attempts for debugging"""
-    log_doc = {
-        "id": str(uuid.uuid4()),
-        "to_email": to_email,
-        "template_type": template_type,
-        "entity_type": entity_type,
-        "entity_id": entity_id,
-        "status": email_status,
-        "error": error,
-        "created_at": datetime.now(timezone.utc).isoformat()
-    }
-    await db.email_logs.insert_one(log_doc)
-    return log_doc
-
 async def send_admin_notification_emails(entity_type: str, entity_id: str, entity_title: str, author_name: str):
-    """Send email notifications to all admins (logs attempt since email not configured)"""
-    admins = await db.users.find({"is_admin": True}, {"_id": 0, "id": 1, "email": 1}).to_list(100)
-    
-    for admin in admins:
-        # Log the email attempt (email provider not configured)
-        await log_email_attempt(
-            to_email=admin["email"],
-            template_type="pending_content_notification",
-            entity_type=entity_type,
-            entity_id=entity_id,
-            email_status="skipped",
-            error="Email provider not configured - notification logged for future delivery"
-        )
+    """Queue email notifications to all admins (logged as skipped when email is not configured)"""
+    admins = await get_admin_roster()
+    if not admins:
+        return 0
+    
+    await queue_emails(
+        template_type="pending_content_notification",
+        context={"entity_type": entity_type, "entity_title": entity_title, "author_name": author_name},
+        recipients=[admin["email"] for admin in admins],
+        entity_type=entity_type,
+        entity_id=entity_id
+    )
     
     return len(admins)
 
+# ============ BACKGROUND JOBS ============
+
+# Persistent job queue in the `jobs` collection. Workers claim jobs with an
+# atomic find_one_and_update and hold them for a visibility timeout; a job
+# whose worker dies is reclaimed after the timeout (at-least-once delivery),
+# so handlers must be idempotent. Failures are retried with exponential backoff.
+JOB_WORKER_CONCURRENCY = int(os.environ.get('JOB_WORKER_CONCURRENCY', '4'))
+JOB_MAX_ATTEMPTS = 5
+JOB_VISIBILITY_TIMEOUT_SECONDS = 300
+JOB_BACKOFF_BASE_SECONDS = 5
+JOB_BACKOFF_MAX_SECONDS = 3600
+JOB_POLL_INTERVAL_SECONDS = 2
+JOB_RETENTION_DAYS = 7
+
+JOB_HANDLERS = {}
+job_wakeup = asyncio.Event()
+jobs_running = Metric("jobs_running", "Background jobs currently executing", "gauge", ("job_type",))
+
+def job_handler(job_type: str):
+    """Register an async handler for a job type"""
+    def register(func):
+        JOB_HANDLERS[job_type] = func
+        return func
+    return register
+
+async def enqueue_job(job_type: str, payload: dict, max_attempts: int = JOB_MAX_ATTEMPTS, delay_seconds: float = 0) -> str:
+    """Persist a job for the worker pool and return its id"""
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job type: {job_type}")
+    now = datetime.now(timezone.utc)
+    job_id = str(uuid.uuid4())
+    await db.jobs.insert_one({
+        "id": job_id,
+        "job_type": job_type,
+        "payload": payload,
+        "status": "queued",
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        "run_at": now + timedelta(seconds=delay_seconds),
+        "locked_until": None,
+        "last_error": None,
+        "created_at": now.isoformat(),
+        "finished_at": None
+    })
+    job_wakeup.set()
+    return job_id
+
+def job_backoff_seconds(attempts: int) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(JOB_BACKOFF_MAX_SECONDS, JOB_BACKOFF_BASE_SECONDS * 2 ** attempts))
+
+async def claim_next_job() -> Optional[dict]:
+    """Atomically claim the next due job, including ones whose worker timed out"""
+    now = datetime.now(timezone.utc)
+    return await db.jobs.find_one_and_update(
+        {"$or": [
+            {"status": "queued", "run_at": {"$lte": now}},
+            {"status": "running", "locked_until": {"$lt": now}}
+        ]},
+        {
+            "$set": {"status": "running", "locked_until": now + timedelta(seconds=JOB_VISIBILITY_TIMEOUT_SECONDS)},
+            "$inc": {"attempts": 1}
+        },
+        sort=[("run_at", 1)],
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+
+async def run_job(job: dict):
+    """Execute a claimed job and record its outcome"""
+    now = datetime.now(timezone.utc)
+    jobs_running.inc(job["job_type"])
+    try:
+        await JOB_HANDLERS[job["job_type"]](**job["payload"])
+    except Exception as e:
+        error = f"{type(e).__name__}: {str(e)}"
+        if job["attempts"] >= job["max_attempts"]:
+            logger.error(f"Job {job['id']} ({job['job_type']}) failed permanently: {error}")
+            update = {"status": "failed", "last_error": error, "locked_until": None, "finished_at": now}
+        else:
+            delay = job_backoff_seconds(job["attempts"])
+            logger.warning(f"Job {job['id']} ({job['job_type']}) attempt {job['attempts']} failed, retrying in {delay:.0f}s: {error}")
+            update = {"status": "queued", "last_error": error, "locked_until": None,
+                      "run_at": now + timedelta(seconds=delay)}
+    else:
+        update = {"status": "done", "locked_until": None, "finished_at": now}
+    finally:
+        jobs_running.dec(job["job_type"])
+    await db.jobs.update_one({"id": job["id"]}, {"$set": update})
+
+async def job_worker(worker_id: int):
+    """Claim and run jobs until cancelled"""
+    while True:
+        try:
+            job = await claim_next_job()
+        except Exception as e:
+            logger.error(f"Job worker {worker_id} claim failed: {str(e)}")
+            job = None
+        if job is None:
+            job_wakeup.clear()
+            try:
+                await asyncio.wait_for(job_wakeup.wait(), timeout=JOB_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        # A failed status write leaves the job running; it is reclaimed after the visibility timeout
+        try:
+            if job["job_type"] not in JOB_HANDLERS:
+                await db.jobs.update_one({"id": job["id"]}, {"$set": {
+                    "status": "failed", "last_error": "No handler registered", "finished_at": datetime.now(timezone.utc)
+                }})
+                continue
+            await run_job(job)
+        except Exception as e:
+            logger.error(f"Job worker {worker_id} failed to record job {job['id']}: {str(e)}")
+
+@job_handler("notify_admins_of_submission")
+async def notify_admins_of_submission(entity_type: str, entity_id: str, entity_title: str, author_name: str):
+    """Fan out in-app and email notifications for newly submitted content"""
+    await create_admin_notifications(entity_type, entity_id, entity_title, author_name)
+    await send_admin_notification_emails(entity_type, entity_id, entity_title, author_name)
+
+# ============ EMAIL OUTBOX ============
+
+# Outbound email goes through email_logs, which doubles as the outbox: rows are
+# written as "queued" and a deliver_emails job sends them. Each batch renders
+# its template once and sends through a pool of SMTP connections capped at
+# SMTP_MAX_CONNECTIONS; failed sends retry with jitter before being marked failed.
+SMTP_HOST = os.environ.get('SMTP_HOST')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', '587'))
+SMTP_USERNAME = os.environ.get('SMTP_USERNAME')
+SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD')
+SMTP_USE_TLS = os.environ.get('SMTP_USE_TLS', 'true').lower() == 'true'
+SMTP_FROM = os.environ.get('SMTP_FROM', 'Paperboy Prince Platform <no-reply@paperboyprince.com>')
+SMTP_MAX_CONNECTIONS = int(os.environ.get('SMTP_MAX_CONNECTIONS', '4'))
+SMTP_TIMEOUT_SECONDS = 30
+EMAIL_SEND_ATTEMPTS = 3
+EMAIL_RETRY_BASE_SECONDS = 1.0
+# Shorter than JOB_VISIBILITY_TIMEOUT_SECONDS, so rows leased by a worker that
+# died are claimable again by the time its job is reclaimed and retried
+EMAIL_LEASE_SECONDS = 240
+
+EMAIL_TEMPLATES = {
+    "pending_content_notification": {
+        "subject": "New {entity_type} awaiting review: {entity_title}",
+        "body": (
+            "Hi,\n\n"
+            "A new {entity_type} '{entity_title}' was submitted by {author_name} and is awaiting review.\n\n"
+            "Review it from the moderation page of the admin dashboard.\n\n"
+            "- Paperboy Prince Platform\n"
+        ),
+    },
+}
+
+class SMTPConnectionPool:
+    """Reusable SMTP connections with a concurrency limit. smtplib is blocking, so I/O runs in threads."""
+    
+    def __init__(self, host: str, port: int, username: Optional[str] = None, password: Optional[str] = None,
+                 use_tls: bool = False, max_connections: int = 4, timeout: float = SMTP_TIMEOUT_SECONDS):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.idle = []
+        self.semaphore = asyncio.Semaphore(max_connections)
+    
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            connection.starttls()
+        if self.username:
+            connection.login(self.username, self.password or "")
+        return connection
+    
+    @staticmethod
+    def _discard(connection: smtplib.SMTP):
+        try:
+            connection.close()
+        except Exception:
+            pass
+    
+    async def send(self, from_addr: str, to_addr: str, data: bytes):
+        async with self.semaphore:
+            connection = self.idle.pop() if self.idle else None
+            reused = connection is not None
+            try:
+                if connection is None:
+                    connection = await asyncio.to_thread(self._connect)
+                try:
+                    await asyncio.to_thread(connection.sendmail, from_addr, [to_addr], data)
+                except smtplib.SMTPServerDisconnected:
+                    if not reused:
+                        raise
+                    # Idle connection was closed by the server; retry once on a fresh one
+                    self._discard(connection)
+                    connection = await asyncio.to_thread(self._connect)
+                    await asyncio.to_thread(connection.sendmail, from_addr, [to_addr], data)
+            except Exception:
+                if connection is not None:
+                    self._discard(connection)
+                raise
+            self.idle.append(connection)
+    
+    async def close(self):
+        idle, self.idle = self.idle, []
+        for connection in idle:
+            try:
+                await asyncio.to_thread(connection.quit)
+            except Exception:
+                self._discard(connection)
+
+smtp_pool = SMTPConnectionPool(
+    SMTP_HOST, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SMTP_USE_TLS, SMTP_MAX_CONNECTIONS
+) if SMTP_HOST else None
+
+def render_email_template(template_type: str, context: dict, from_addr: str = SMTP_FROM) -> bytes:
+    """Render a template to wire format once per batch; recipients are added by address_email"""
+    template = EMAIL_TEMPLATES[template_type]
+    # Header values must stay on one line
+    safe_context = {k: " ".join(str(v).split()) for k, v in context.items()}
+    message = EmailMessage(policy=email.policy.SMTP)
+    message["From"] = from_addr
+    message["Subject"] = template["subject"].format(**safe_context)
+    message["Date"] = email.utils.formatdate(localtime=False)
+    message.set_content(template["body"].format(**safe_context))
+    return message.as_bytes()
+
+def address_email(rendered: bytes, to_email: str) -> bytes:
+    """Prefix per-recipient headers onto a rendered message"""
+    return f"To: {to_email}\r\nMessage-ID: {email.utils.make_msgid()}\r\n".encode("utf-8") + rendered
+
+def is_permanent_email_error(error: Exception) -> bool:
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    code = getattr(error, "smtp_code", None)
+    return isinstance(code, int) and 500 <= code < 600
+
+async def send_with_retries(pool: SMTPConnectionPool, from_addr: str, to_email: str, rendered: bytes) -> tuple:
+    """Send one message, retrying transient failures with jitter. Returns (status, error, attempts)."""
+    error = None
+    for attempt in range(1, EMAIL_SEND_ATTEMPTS + 1):
+        try:
+            await pool.send(from_addr, to_email, address_email(rendered, to_email))
+            return "sent", None, attempt
+        except (smtplib.SMTPException, OSError) as e:
+            error = f"{type(e).__name__}: {str(e)}"
+            if is_permanent_email_error(e) or attempt == EMAIL_SEND_ATTEMPTS:
+                return "failed", error, attempt
+            await asyncio.sleep(random.uniform(0, EMAIL_RETRY_BASE_SECONDS * 2 ** attempt))
+    return "failed", error, EMAIL_SEND_ATTEMPTS
+
+async def queue_emails(template_type: str, context: dict, recipients: list, entity_type: str, entity_id: str) -> list:
+    """Write outbox rows (idempotent per recipient and entity) and schedule delivery"""
+    now = datetime.now(timezone.utc).isoformat()
+    email_status, error = ("queued", None) if smtp_pool else (
+        "skipped", "Email provider not configured - notification logged for future delivery"
+    )
+    operations = [
+        UpdateOne(
+            {"template_type": template_type, "entity_id": entity_id, "to_email": to_email},
+            {"$setOnInsert": {
+                "id": str(uuid.uuid4()),
+                "to_email": to_email,
+                "template_type": template_type,
+                "entity_type": entity_type,
+                "entity_id": entity_id,
+                "context": context,
+                "status": email_status,
+                "error": error,
+                "attempts": 0,
+                "created_at": now
+            }},
+            upsert=True
+        )
+        for to_email in recipients
+    ]
+    try:
+        await db.email_logs.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        # A concurrent upsert for the same recipient inserted first; the unique index keeps one row
+        if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+            raise
+    if not smtp_pool:
+        return []
+    
+    queued = await db.email_logs.find(
+        {"template_type": template_type, "entity_id": entity_id, "status": "queued"},
+        {"_id": 0, "id": 1}
+    ).to_list(None)
+    email_ids = [row["id"] for row in queued]
+    if email_ids:
+        await enqueue_job("deliver_emails", {"email_ids": email_ids})
+    return email_ids
+
+@job_handler("deliver_emails")
+async def deliver_emails(email_ids: list):
+    """Deliver queued outbox rows, rendering each template/context group once"""
+    if not smtp_pool:
+        return
+    # Lease the rows so overlapping jobs for the same ids never send twice;
+    # rows left "sending" by a crashed worker become claimable when the lease ends
+    now = datetime.now(timezone.utc)
+    claim_id = str(uuid.uuid4())
+    await db.email_logs.update_many(
+        {"id": {"$in": email_ids}, "$or": [
+            {"status": "queued"},
+            {"status": "sending", "lease_until": {"$lt": now.isoformat()}}
+        ]},
+        {"$set": {"status": "sending", "claim_id": claim_id,
+                  "lease_until": (now + timedelta(seconds=EMAIL_LEASE_SECONDS)).isoformat()}}
+    )
+    rows = await db.email_logs.find({"claim_id": claim_id, "status": "sending"}, {"_id": 0}).to_list(None)
+    
+    batches = defaultdict(list)
+    for row in rows:
+        batches[(row["template_type"], json.dumps(row.get("context") or {}, sort_keys=True))].append(row)
+    
+    for (template_type, _), batch in batches.items():
+        # Renew the lease per batch so a long run doesn't let another job re-claim unsent rows
+        await db.email_logs.update_many(
+            {"claim_id": claim_id, "status": "sending"},
+            {"$set": {"lease_until": (datetime.now(timezone.utc) + timedelta(seconds=EMAIL_LEASE_SECONDS)).isoformat()}}
+        )
+        rendered = render_email_template(template_type, batch[0].get("context") or {})
+        results = await asyncio.gather(*(
+            send_with_retries(smtp_pool, SMTP_FROM, row["to_email"], rendered) for row in batch
+        ))
+        finished_at = datetime.now(timezone.utc).isoformat()
+        await db.email_logs.bulk_write([
+            UpdateOne({"id": row["id"]}, {
+                "$set": {"status": email_status, "error": error, "updated_at": finished_at,
+                         "sent_at": finished_at if email_status == "sent" else None},
+                "$unset": {"claim_id": "", "lease_until": ""},
+                "$inc": {"attempts": attempts}
+            })
+            for row, (email_status, error, attempts) in zip(batch, results)
+        ], ordered=False)
+    
+    # Rows still leased by another job: if that worker died, pick them up once its lease ends
+    leased = await db.email_logs.find(
+        {"id": {"$in": email_ids}, "status": "sending", "claim_id": {"$ne": claim_id}},
+        {"_id": 0, "id": 1, "lease_until": 1}
+    ).to_list(None)
+    if leased:
+        lease_end = max(datetime.fromisoformat(row["lease_until"]) for row in leased)
+        delay = max(0, (lease_end - datetime.now(timezone.utc)).total_seconds()) + 1
+        await enqueue_job("deliver_emails", {"email_ids": [row["id"] for row in leased]}, delay_seconds=delay)
+
 # ============ AUTH ROUTES ============
 
 @api_router.post("/auth/register")
@@ -547,6 +2007,8 @@ async def register(user_data: UserCreate):
         "created_at": now
     }
     await db.users.insert_one(user_doc)
+    if is_admin:
+        invalidate_admin_roster()
     
     token = create_token(user_id, user_data.email, is_admin)
     return {
@@ -561,16 +2023,22 @@ async def register(user_data: UserCreate):
     }
 
 @api_router.post("/auth/login")
-async def login(login_data: UserLogin):
-    user = await db.users.find_one({"email": login_data.email}, {"_id": 0})
-    if not user or not verify_password(login_data.password, user["password_hash"]):
-        raise HTTPException(status_code=401, detail="Invalid credentials")
+async def login(login_data: UserLogin, request: Request):
+    throttle_keys = enforce_login_throttle(request, login_data.email)
+    try:
+        user = await db.users.find_one({"email": login_data.email}, {"_id": 0})
+        if not user or not verify_password(login_data.password, user["password_hash"]):
+            record_login_failure(request, login_data.email)
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        record_login_success(request, login_data.email)
+    finally:
+        login_throttle.release(throttle_keys)
     
     # Update last login timestamp
     now = datetime.now(timezone.utc).isoformat()
     await db.users.update_one({"id": user["id"]}, {"$set": {"last_login_at": now}})
     
-    token = create_token(user["id"], user["email"], user["is_admin"])
+    token = create_token(user["id"], user["email"], user["is_admin"], token_generation(user))
     return {
         "token": token,
         "user": {
@@ -583,15 +2051,21 @@ async def login(login_data: UserLogin):
     }
 
 @api_router.post("/auth/admin-login")
-async def admin_login(login_data: UserLogin):
-    user = await db.users.find_one({"email": login_data.email}, {"_id": 0})
-    if not user or not verify_password(login_data.password, user["password_hash"]):
-        raise HTTPException(status_code=401, detail="Invalid credentials")
+async def admin_login(login_data: UserLogin, request: Request):
+    throttle_keys = enforce_login_throttle(request, login_data.email)
+    try:
+        user = await db.users.find_one({"email": login_data.email}, {"_id": 0})
+        if not user or not verify_password(login_data.password, user["password_hash"]):
+            record_login_failure(request, login_data.email)
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        record_login_success(request, login_data.email)
+    finally:
+        login_throttle.release(throttle_keys)
     
     if not user["is_admin"]:
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    token = create_token(user["id"], user["email"], user["is_admin"])
+    token = create_token(user["id"], user["email"], user["is_admin"], token_generation(user))
     return {
         "token": token,
         "user": {
@@ -623,22 +2097,24 @@ async def change_password(password_data: PasswordChange, user: dict = Depends(ge
     if len(password_data.new_password) < 8:
         raise HTTPException(status_code=400, detail="New password must be at least 8 characters")
     
-    # Update password
+    # Update password and sign out other sessions; the caller gets a fresh token
     new_hash = hash_password(password_data.new_password)
-    await db.users.update_one(
-        {"id": user["id"]},
-        {"$set": {"password_hash": new_hash}}
-    )
+    updated = await revoke_user_tokens(user["id"], {"password_hash": new_hash})
     
-    return {"message": "Password changed successfully"}
+    return {
+        "message": "Password changed successfully",
+        "token": create_token(updated["id"], updated["email"], updated["is_admin"], token_generation(updated))
+    }
 
-@api_router.post("/auth/reset-password")
+@api_router.post("/auth/logout-all")
+async def logout_all_sessions(user: dict = Depends(get_current_user)):
+    """Revoke every token issued to the current user"""
+    await revoke_user_tokens(user["id"])
+    return {"message": "Signed out of all sessions"}
+
+@api_router.post("/auth/reset-password", dependencies=[Depends(reset_password_rate_limit)])
 async def reset_password_with_token(reset_data: PasswordResetRequest):
-    """Reset password using a one-time token (public endpoint)"""
-    # Rate limit by token to prevent brute force
-    if not check_rate_limit(f"reset:{reset_data.token[:8]}"):
-        raise HTTPException(status_code=429, detail="Too many attempts. Please wait before trying again.")
-    
+    """Reset password using a one-time token (public endpoint, rate limited by token)"""
     # Hash the provided token to compare with stored hash
     token_hash = hash_reset_token(reset_data.token)
     
@@ -665,12 +2141,8 @@ async def reset_password_with_token(reset_data: PasswordResetRequest):
     
     # Update user password
     new_hash = hash_password(reset_data.new_password)
-    result = await db.users.update_one(
-        {"id": reset_doc["user_id"]},
-        {"$set": {"password_hash": new_hash}}
-    )
-    
-    if result.modified_count == 0:
+    updated = await revoke_user_tokens(reset_doc["user_id"], {"password_hash": new_hash})
+    if not updated:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Invalidate the token
@@ -747,9 +2219,68 @@ async def get_uploaded_image(filename: str):
 
 # ============ POST ROUTES ============
 
-# Comment rate limiting
-comment_rate_limit = defaultdict(float)
-COMMENT_RATE_LIMIT_SECONDS = 15
+# Listing endpoints accept view=summary (or an explicit fields=a,b,c) and map it
+# to a Mongo projection, so cards get a stored excerpt instead of the full
+# content. excerpt and reading_time are computed once when a post is written.
+POST_EXCERPT_LENGTH = 200
+POST_WORDS_PER_MINUTE = 200
+POST_SUMMARY_FIELDS = [
+    "id", "title", "excerpt", "reading_time", "image_url", "video_url", "author_id", "author_name",
+    "status", "rejection_reason", "created_at", "updated_at", "comment_count"
+]
+POST_LIST_FIELDS = set(PostResponse.model_fields) | {"comment_count"}
+POST_BACKFILL_BATCH_SIZE = 500
+
+def post_summary(content: str) -> dict:
+    """Excerpt and reading time (minutes) stored alongside a post's content"""
+    words = content.split()
+    excerpt = " ".join(words)
+    if len(excerpt) > POST_EXCERPT_LENGTH:
+        excerpt = excerpt[:POST_EXCERPT_LENGTH].rsplit(" ", 1)[0].rstrip(".,;:!?") + "…"
+    return {"excerpt": excerpt, "reading_time": max(1, math.ceil(len(words) / POST_WORDS_PER_MINUTE))}
+
+def post_list_fields(view: Optional[str], fields: Optional[str]) -> Optional[list]:
+    """Resolve view=/fields= to the post fields to return (id always included), or None for full posts"""
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = sorted(set(requested) - POST_LIST_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        return ["id"] + [f for f in requested if f != "id"]
+    if view is None or view == "full":
+        return None
+    if view == "summary":
+        return POST_SUMMARY_FIELDS
+    raise HTTPException(status_code=400, detail="Invalid view. Use 'full' or 'summary'")
+
+def post_projection(selected: Optional[list]) -> dict:
+    projection = {"_id": 0}
+    if selected is not None:
+        projection.update({f: 1 for f in selected if f != "comment_count"})
+    return projection
+
+async def add_comment_counts(posts: list, selected: Optional[list]):
+    if selected is not None and "comment_count" not in selected:
+        return
+    for post in posts:
+        post["comment_count"] = await db.comments.count_documents({"post_id": post["id"], "status": "approved"})
+
+async def backfill_post_summaries():
+    """One-time backfill of excerpt and reading_time for posts written before they were stored"""
+    total = 0
+    while True:
+        legacy = await db.posts.find(
+            {"excerpt": {"$exists": False}}, {"_id": 1, "content": 1}
+        ).limit(POST_BACKFILL_BATCH_SIZE).to_list(POST_BACKFILL_BATCH_SIZE)
+        if not legacy:
+            break
+        operations = [UpdateOne({"_id": p["_id"]}, {"$set": post_summary(p.get("content") or "")}) for p in legacy]
+        await db.posts.bulk_write(operations, ordered=False)
+        total += len(operations)
+    
+    if total:
+        logger.info(f"Backfilled excerpt and reading_time on {total} posts")
+    return total
 
 @api_router.get("/posts")
 async def get_posts(
@@ -759,9 +2290,13 @@ async def get_posts(
     limit: int = 12,
     status: Optional[str] = None,
     admin_view: bool = False,
+    view: Optional[str] = None,
+    fields: Optional[str] = None,
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(lambda: None)
 ):
     """Get posts with search, filters, and pagination. Public sees only approved."""
+    selected = post_list_fields(view, fields)
+    
     # Check if user is admin for admin_view
     is_admin = False
     if admin_view:
@@ -799,26 +2334,25 @@ async def get_posts(
     skip = (page - 1) * limit
     
     # Fetch posts
-    posts = await db.posts.find(query, {"_id": 0}).sort("created_at", sort_order).skip(skip).limit(limit).to_list(limit)
+    posts = await db.posts.find(query, post_projection(selected)).sort("created_at", sort_order).skip(skip).limit(limit).to_list(limit)
     
     # Add comment count to each post
-    for post in posts:
-        post["comment_count"] = await db.comments.count_documents({"post_id": post["id"], "status": "approved"})
+    await add_comment_counts(posts, selected)
     
-    return {
+    return fast_response({
         "posts": posts,
         "total": total,
         "page": page,
         "limit": limit,
         "total_pages": (total + limit - 1) // limit
-    }
+    })
 
 @api_router.get("/posts/latest")
-async def get_latest_posts(limit: int = 6):
+async def get_latest_posts(limit: int = 6, view: Optional[str] = None, fields: Optional[str] = None):
     """Get latest approved posts for homepage preview"""
-    posts = await db.posts.find({"status": "approved"}, {"_id": 0}).sort("created_at", -1).limit(limit).to_list(limit)
-    for post in posts:
-        post["comment_count"] = await db.comments.count_documents({"post_id": post["id"], "status": "approved"})
+    selected = post_list_fields(view, fields)
+    posts = await db.posts.find({"status": "approved"}, post_projection(selected)).sort("created_at", -1).limit(limit).to_list(limit)
+    await add_comment_counts(posts, selected)
     return posts
 
 @api_router.get("/posts/pending", response_model=List[PostResponse])
@@ -828,9 +2362,18 @@ async def get_pending_posts(user: dict = Depends(get_admin_user)):
     return posts
 
 @api_router.get("/posts/my", response_model=List[PostResponse])
-async def get_my_posts(user: dict = Depends(get_current_user)):
+async def get_my_posts(
+    user: dict = Depends(get_current_user),
+    view: Optional[str] = None,
+    fields: Optional[str] = None
+):
     """Get current user's posts (all statuses)"""
-    posts = await db.posts.find({"author_id": user["id"]}, {"_id": 0}).sort("created_at", -1).to_list(100)
+    selected = post_list_fields(view, fields)
+    posts = await db.posts.find({"author_id": user["id"]}, post_projection(selected)).sort("created_at", -1).to_list(100)
+    if selected is not None:
+        # Partial posts would fail PostResponse validation; they are our own documents
+        await add_comment_counts(posts, selected)
+        return FastJSONResponse(posts)
     return posts
 
 @api_router.get("/posts/{post_id}")
@@ -866,14 +2409,21 @@ async def create_post(post_data: PostCreate, user: dict = Depends(get_current_us
         "reviewed_by": user["id"] if user.get("is_admin") else None,
         "reviewed_at": now if user.get("is_admin") else None,
         "created_at": now,
-        "updated_at": now
+        "updated_at": now,
+        **post_summary(post_data.content)
     }
     await db.posts.insert_one(post_doc)
+    if post_status == "approved":
+        invalidate_public_cache(*POST_CACHE_PATHS)
     
     # If pending, notify admins
     if post_status == "pending":
-        await create_admin_notifications("post", post_id, post_data.title, user["name"])
-        await send_admin_notification_emails("post", post_id, post_data.title, user["name"])
+        await enqueue_job("notify_admins_of_submission", {
+            "entity_type": "post",
+            "entity_id": post_id,
+            "entity_title": post_data.title,
+            "author_name": user["name"]
+        })
     
     return post_doc
 
@@ -905,6 +2455,7 @@ async def moderate_post(post_id: str, moderation: PostModeration, user: dict = D
         update_data["rejection_reason"] = moderation.rejection_reason
     
     await db.posts.update_one({"id": post_id}, {"$set": update_data})
+    invalidate_public_cache(*POST_CACHE_PATHS)
     
     # Create audit log
     await create_audit_log(
@@ -927,8 +2478,11 @@ async def update_post(post_id: str, post_data: PostUpdate, user: dict = Depends(
     
     update_data = {k: v for k, v in post_data.model_dump().items() if v is not None}
     update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
+    if "content" in update_data:
+        update_data.update(post_summary(update_data["content"]))
     
     await db.posts.update_one({"id": post_id}, {"$set": update_data})
+    invalidate_public_cache(*POST_CACHE_PATHS)
     updated = await db.posts.find_one({"id": post_id}, {"_id": 0})
     return updated
 
@@ -939,19 +2493,11 @@ async def delete_post(post_id: str, user: dict = Depends(get_admin_user)):
         raise HTTPException(status_code=404, detail="Post not found")
     # Also delete associated comments
     await db.comments.delete_many({"post_id": post_id})
+    invalidate_public_cache(*POST_CACHE_PATHS)
     return {"message": "Post deleted"}
 
 # ============ COMMENT ROUTES ============
 
-def check_comment_rate_limit(user_id: str) -> bool:
-    """Check if user can create a comment (rate limited to 1 per 15 seconds)"""
-    now = time.time()
-    last_comment = comment_rate_limit.get(user_id, 0)
-    if now - last_comment < COMMENT_RATE_LIMIT_SECONDS:
-        return False
-    comment_rate_limit[user_id] = now
-    return True
-
 @api_router.get("/posts/{post_id}/comments", response_model=List[CommentResponse])
 async def get_post_comments(post_id: str):
     """Get all approved comments for a post (public)"""
@@ -969,14 +2515,12 @@ async def get_post_comments(post_id: str):
     return comments
 
 @api_router.post("/posts/{post_id}/comments", response_model=CommentResponse)
-async def create_comment(post_id: str, comment_data: CommentCreate, user: dict = Depends(get_current_user)):
-    """Create a comment on a post (authenticated users only)"""
-    # Rate limit check
-    if not check_comment_rate_limit(user["id"]):
-        raise HTTPException(
-            status_code=429, 
-            detail=f"Please wait {COMMENT_RATE_LIMIT_SECONDS} seconds between comments"
-        )
+async def create_comment(post_id: str, comment_data: CommentCreate, request: Request,
+                         user: dict = Depends(get_current_user)):
+    """Create a comment on a post (authenticated users only, rate limited)"""
+    # Checked in the handler, not as a route dependency, so the token is only spent
+    # once the body has validated: a rejected (422) comment doesn't lock the user out
+    await comment_rate_limit(request, user["id"])
     
     # Verify post exists and is approved
     post = await db.posts.find_one({"id": post_id}, {"_id": 0})
@@ -999,6 +2543,7 @@ async def create_comment(post_id: str, comment_data: CommentCreate, user: dict =
         "created_at": now
     }
     await db.comments.insert_one(comment_doc)
+    invalidate_public_cache(*POST_CACHE_PATHS)  # Lists carry comment counts
     
     return comment_doc
 
@@ -1017,18 +2562,73 @@ async def delete_comment(comment_id: str, user: dict = Depends(get_current_user)
         raise HTTPException(status_code=403, detail="Not authorized to delete this comment")
     
     await db.comments.delete_one({"id": comment_id})
+    invalidate_public_cache(*POST_CACHE_PATHS)
     return {"message": "Comment deleted"}
 
 # ============ PRODUCT ROUTES ============
 
+# Products only change when an admin edits them, so reads are served from an
+# in-process snapshot indexed by id. A write bumps the catalog version stored in
+# Mongo and swaps in a freshly loaded snapshot; other workers compare their
+# version with the stored one at most every PRODUCT_CATALOG_CHECK_SECONDS and
+# reload when it has moved.
+PRODUCT_CATALOG_CHECK_SECONDS = float(os.environ.get('PRODUCT_CATALOG_CHECK_SECONDS', '2'))
+
+class ProductCatalog:
+    """Versioned product snapshot; (version, products, by_id) is replaced as a whole, never mutated"""
+    def __init__(self):
+        self.snapshot = (-1, [], {})
+        self.checked_at = 0.0
+        self.lock = asyncio.Lock()
+    
+    async def reload(self, version: int):
+        products = await db.products.find({}, {"_id": 0}).to_list(None)
+        self.snapshot = (version, products, {p["id"]: p for p in products})
+        self.checked_at = time.monotonic()
+        invalidate_public_cache("/api/products")
+    
+    async def current(self, max_age: float = PRODUCT_CATALOG_CHECK_SECONDS) -> tuple:
+        """Return (version, products, by_id), reloading if another worker published a newer version.
+        The stored version is checked when ours is older than `max_age` seconds (0: always)."""
+        if time.monotonic() - self.checked_at >= max_age:
+            async with self.lock:
+                if time.monotonic() - self.checked_at >= max_age:
+                    state = await db.catalog_versions.find_one({"_id": "products"})
+                    version = state["version"] if state else 0
+                    if version != self.snapshot[0]:
+                        await self.reload(version)
+                    self.checked_at = time.monotonic()
+        return self.snapshot
+    
+    async def publish(self):
+        """Bump the stored version after a product write and swap in a fresh snapshot"""
+        state = await db.catalog_versions.find_one_and_update(
+            {"_id": "products"},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        async with self.lock:
+            await self.reload(state["version"])
+    
+    async def get(self, product_id: str) -> Optional[dict]:
+        """Look up a product, checking Mongo for ids the snapshot doesn't know yet"""
+        _, _, by_id = await self.current()
+        product = by_id.get(product_id)
+        if product is None:
+            product = await db.products.find_one({"id": product_id}, {"_id": 0})
+        return product
+
+product_catalog = ProductCatalog()
+
 @api_router.get("/products", response_model=List[ProductResponse])
 async def get_products():
-    products = await db.products.find({}, {"_id": 0}).to_list(100)
-    return products
+    _, products, _ = await product_catalog.current()
+    return products[:100]
 
 @api_router.get("/products/{product_id}", response_model=ProductResponse)
 async def get_product(product_id: str):
-    product = await db.products.find_one({"id": product_id}, {"_id": 0})
+    product = await product_catalog.get(product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     return product
@@ -1048,6 +2648,7 @@ async def create_product(product_data: ProductCreate, user: dict = Depends(get_a
         "created_at": now
     }
     await db.products.insert_one(product_doc)
+    await product_catalog.publish()
     return product_doc
 
 @api_router.put("/products/{product_id}", response_model=ProductResponse)
@@ -1058,6 +2659,8 @@ async def update_product(product_id: str, product_data: ProductUpdate, user: dic
     
     update_data = {k: v for k, v in product_data.model_dump().items() if v is not None}
     await db.products.update_one({"id": product_id}, {"$set": update_data})
+    await product_catalog.publish()
+    await invalidate_cart_snapshots_for_product(product_id)
     updated = await db.products.find_one({"id": product_id}, {"_id": 0})
     return updated
 
@@ -1066,6 +2669,8 @@ async def delete_product(product_id: str, user: dict = Depends(get_admin_user)):
     result = await db.products.delete_one({"id": product_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
+    await product_catalog.publish()
+    await invalidate_cart_snapshots_for_product(product_id)
     return {"message": "Product deleted"}
 
 # ============ EVENT ROUTES ============
@@ -1076,7 +2681,7 @@ async def get_events():
     for event in events:
         rsvp_count = await db.rsvps.count_documents({"event_id": event["id"]})
         event["rsvp_count"] = rsvp_count
-    return events
+    return fast_response(events, EventResponse)
 
 @api_router.get("/events/{event_id}", response_model=EventResponse)
 async def get_event(event_id: str):
@@ -1102,6 +2707,7 @@ async def create_event(event_data: EventCreate, user: dict = Depends(get_admin_u
         "created_at": now
     }
     await db.events.insert_one(event_doc)
+    invalidate_public_cache("/api/events")
     event_doc["rsvp_count"] = 0
     return event_doc
 
@@ -1113,6 +2719,7 @@ async def update_event(event_id: str, event_data: EventUpdate, user: dict = Depe
     
     update_data = {k: v for k, v in event_data.model_dump().items() if v is not None}
     await db.events.update_one({"id": event_id}, {"$set": update_data})
+    invalidate_public_cache("/api/events")
     updated = await db.events.find_one({"id": event_id}, {"_id": 0})
     rsvp_count = await db.rsvps.count_documents({"event_id": event_id})
     updated["rsvp_count"] = rsvp_count
@@ -1124,18 +2731,15 @@ async def delete_event(event_id: str, user: dict = Depends(get_admin_user)):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Event not found")
     await db.rsvps.delete_many({"event_id": event_id})
+    invalidate_public_cache("/api/events")
     return {"message": "Event deleted"}
 
 @api_router.post("/events/{event_id}/rsvp")
 async def rsvp_event(event_id: str, user: dict = Depends(get_current_user)):
-    event = await db.events.find_one({"id": event_id})
+    event = await db.events.find_one({"id": event_id}, {"_id": 1})
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    existing = await db.rsvps.find_one({"event_id": event_id, "user_id": user["id"]})
-    if existing:
-        raise HTTPException(status_code=400, detail="Already RSVPed")
-    
     rsvp_id = str(uuid.uuid4())
     now = datetime.now(timezone.utc).isoformat()
     
@@ -1147,7 +2751,12 @@ async def rsvp_event(event_id: str, user: dict = Depends(get_current_user)):
         "user_email": user["email"],
         "created_at": now
     }
-    await db.rsvps.insert_one(rsvp_doc)
+    try:
+        # Unique (event_id, user_id) index: a double-click can't create a second RSVP
+        await db.rsvps.insert_one(rsvp_doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Already RSVPed")
+    invalidate_public_cache("/api/events")  # The list carries RSVP counts
     return {"message": "RSVP confirmed", "rsvp_id": rsvp_id}
 
 @api_router.delete("/events/{event_id}/rsvp")
@@ -1155,6 +2764,7 @@ async def cancel_rsvp(event_id: str, user: dict = Depends(get_current_user)):
     result = await db.rsvps.delete_one({"event_id": event_id, "user_id": user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="RSVP not found")
+    invalidate_public_cache("/api/events")
     return {"message": "RSVP cancelled"}
 
 @api_router.get("/events/{event_id}/rsvps", response_model=List[RSVPResponse])
@@ -1177,7 +2787,7 @@ async def get_actions():
     for action in actions:
         count = await db.action_participants.count_documents({"action_id": action["id"]})
         action["participant_count"] = count
-    return actions
+    return fast_response(actions, ActionResponse)
 
 @api_router.get("/actions/pending", response_model=List[ActionResponse])
 async def get_pending_actions(user: dict = Depends(get_admin_user)):
@@ -1233,11 +2843,17 @@ async def create_action(action_data: ActionCreate, user: dict = Depends(get_curr
         "created_at": now
     }
     await db.actions.insert_one(action_doc)
+    if action_status == "approved":
+        invalidate_public_cache("/api/actions")
     
     # If pending, notify admins
     if action_status == "pending":
-        await create_admin_notifications("action", action_id, action_data.title, user["name"])
-        await send_admin_notification_emails("action", action_id, action_data.title, user["name"])
+        await enqueue_job("notify_admins_of_submission", {
+            "entity_type": "action",
+            "entity_id": action_id,
+            "entity_title": action_data.title,
+            "author_name": user["name"]
+        })
     
     action_doc["participant_count"] = 0
     return action_doc
@@ -1269,6 +2885,7 @@ async def moderate_action(action_id: str, moderation: ActionModeration, user: di
         update_data["rejection_reason"] = moderation.rejection_reason
     
     await db.actions.update_one({"id": action_id}, {"$set": update_data})
+    invalidate_public_cache("/api/actions")
     
     # Create audit log
     await create_audit_log(
@@ -1293,6 +2910,7 @@ async def update_action(action_id: str, action_data: ActionUpdate, user: dict =
     
     update_data = {k: v for k, v in action_data.model_dump().items() if v is not None}
     await db.actions.update_one({"id": action_id}, {"$set": update_data})
+    invalidate_public_cache("/api/actions")
     updated = await db.actions.find_one({"id": action_id}, {"_id": 0})
     count = await db.action_participants.count_documents({"action_id": action_id})
     updated["participant_count"] = count
@@ -1304,18 +2922,15 @@ async def delete_action(action_id: str, user: dict = Depends(get_admin_user)):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Action not found")
     await db.action_participants.delete_many({"action_id": action_id})
+    invalidate_public_cache("/api/actions")
     return {"message": "Action deleted"}
 
 @api_router.post("/actions/{action_id}/signup")
 async def signup_action(action_id: str, signup_data: ActionSignup, user: dict = Depends(get_current_user)):
-    action = await db.actions.find_one({"id": action_id})
+    action = await db.actions.find_one({"id": action_id}, {"_id": 1})
     if not action:
         raise HTTPException(status_code=404, detail="Action not found")
     
-    existing = await db.action_participants.find_one({"action_id": action_id, "user_id": user["id"]})
-    if existing:
-        raise HTTPException(status_code=400, detail="Already signed up")
-    
     participant_id = str(uuid.uuid4())
     now = datetime.now(timezone.utc).isoformat()
     
@@ -1328,7 +2943,11 @@ async def signup_action(action_id: str, signup_data: ActionSignup, user: dict =
         "message": signup_data.message,
         "created_at": now
     }
-    await db.action_participants.insert_one(participant_doc)
+    try:
+        await db.action_participants.insert_one(participant_doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Already signed up")
+    invalidate_public_cache("/api/actions")  # The list carries participant counts
     return {"message": "Signup confirmed", "participant_id": participant_id}
 
 @api_router.delete("/actions/{action_id}/signup")
@@ -1336,6 +2955,7 @@ async def cancel_signup(action_id: str, user: dict = Depends(get_current_user)):
     result = await db.action_participants.delete_one({"action_id": action_id, "user_id": user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Signup not found")
+    invalidate_public_cache("/api/actions")
     return {"message": "Signup cancelled"}
 
 @api_router.get("/actions/{action_id}/participants", response_model=List[ActionParticipantResponse])
@@ -1351,14 +2971,32 @@ async def get_my_signups(user: dict = Depends(get_current_user)):
 
 # ============ CART ROUTES ============
 
-@api_router.get("/cart", response_model=CartResponse)
-async def get_cart(user: dict = Depends(get_current_user)):
-    cart_items = await db.cart_items.find({"user_id": user["id"]}, {"_id": 0}).to_list(100)
+# A hydrated cart is kept in cart_snapshots (one document per user) so repeat
+# views cost a single read and no product lookups. Every cart or product write
+# bumps the snapshot's version and drops its contents; a rebuild only stores
+# its result if the version it started from is still current, so a view racing
+# a write can never save a stale cart.
+CART_SNAPSHOT_CLEAR = {"$inc": {"version": 1}, "$unset": {"items": "", "total": ""}}
+
+async def invalidate_cart_snapshot(user_id: str):
+    await db.cart_snapshots.update_one({"user_id": user_id}, CART_SNAPSHOT_CLEAR, upsert=True)
+
+async def invalidate_cart_snapshots_for_product(product_id: str):
+    await db.cart_snapshots.update_many({"items.product_id": product_id}, CART_SNAPSHOT_CLEAR)
+
+async def hydrate_cart(user_id: str) -> dict:
+    """Join a user's cart items with their products from the catalog snapshot"""
+    cart_items = await db.cart_items.find({"user_id": user_id}, {"_id": 0}).to_list(100)
+    # The result is stored until the next cart or product write, so it must come from the
+    # latest published catalog, not one up to PRODUCT_CATALOG_CHECK_SECONDS old. A product
+    # write publishes before it invalidates snapshots, so a rebuild that saw an older
+    # version loses the snapshot compare-and-set in get_cart.
+    _, _, products = await product_catalog.current(max_age=0)
+    
     items = []
     total = 0.0
-    
     for item in cart_items:
-        product = await db.products.find_one({"id": item["product_id"]}, {"_id": 0})
+        product = products.get(item["product_id"])
         if product:
             cart_item = {
                 "id": item["id"],
@@ -1373,29 +3011,41 @@ async def get_cart(user: dict = Depends(get_current_user)):
     
     return {"items": items, "total": round(total, 2)}
 
+@api_router.get("/cart", response_model=CartResponse)
+async def get_cart(user: dict = Depends(get_current_user)):
+    snapshot = await db.cart_snapshots.find_one({"user_id": user["id"]}, {"_id": 0})
+    if snapshot and "items" in snapshot:
+        return snapshot
+    
+    version = snapshot["version"] if snapshot else 0
+    cart = await hydrate_cart(user["id"])
+    try:
+        await db.cart_snapshots.update_one(
+            {"user_id": user["id"], "version": version},
+            {"$set": cart},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        pass  # The cart changed while we were hydrating; the next view rebuilds it
+    return cart
+
 @api_router.post("/cart/add")
 async def add_to_cart(item_data: CartItemAdd, user: dict = Depends(get_current_user)):
-    product = await db.products.find_one({"id": item_data.product_id})
+    product = await product_catalog.get(item_data.product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    existing = await db.cart_items.find_one({"user_id": user["id"], "product_id": item_data.product_id})
-    if existing:
-        new_quantity = existing["quantity"] + item_data.quantity
-        await db.cart_items.update_one(
-            {"id": existing["id"]},
-            {"$set": {"quantity": new_quantity}}
-        )
-        return {"message": "Cart updated", "quantity": new_quantity}
-    
     cart_item_id = str(uuid.uuid4())
-    cart_doc = {
-        "id": cart_item_id,
-        "user_id": user["id"],
-        "product_id": item_data.product_id,
-        "quantity": item_data.quantity
-    }
-    await db.cart_items.insert_one(cart_doc)
+    # One atomic upsert on the unique (user_id, product_id) index: concurrent adds sum up
+    item = await upsert_with_retry(lambda: db.cart_items.find_one_and_update(
+        {"user_id": user["id"], "product_id": item_data.product_id},
+        {"$inc": {"quantity": item_data.quantity}, "$setOnInsert": {"id": cart_item_id}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    ))
+    await invalidate_cart_snapshot(user["id"])
+    if item["id"] != cart_item_id:
+        return {"message": "Cart updated", "quantity": item["quantity"]}
     return {"message": "Added to cart", "cart_item_id": cart_item_id}
 
 @api_router.put("/cart/{cart_item_id}")
@@ -1404,6 +3054,7 @@ async def update_cart_item(cart_item_id: str, quantity: int, user: dict = Depend
         result = await db.cart_items.delete_one({"id": cart_item_id, "user_id": user["id"]})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Cart item not found")
+        await invalidate_cart_snapshot(user["id"])
         return {"message": "Item removed from cart"}
     
     result = await db.cart_items.update_one(
@@ -1412,6 +3063,7 @@ async def update_cart_item(cart_item_id: str, quantity: int, user: dict = Depend
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Cart item not found")
+    await invalidate_cart_snapshot(user["id"])
     return {"message": "Cart updated"}
 
 @api_router.delete("/cart/{cart_item_id}")
@@ -1419,11 +3071,13 @@ async def remove_from_cart(cart_item_id: str, user: dict = Depends(get_current_u
     result = await db.cart_items.delete_one({"id": cart_item_id, "user_id": user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Cart item not found")
+    await invalidate_cart_snapshot(user["id"])
     return {"message": "Item removed from cart"}
 
 @api_router.delete("/cart")
 async def clear_cart(user: dict = Depends(get_current_user)):
     await db.cart_items.delete_many({"user_id": user["id"]})
+    await invalidate_cart_snapshot(user["id"])
     return {"message": "Cart cleared"}
 
 # ============ NOTIFY ME ROUTES ============
@@ -1431,20 +3085,14 @@ async def clear_cart(user: dict = Depends(get_current_user)):
 @api_router.post("/notify", response_model=NotifyEmailResponse)
 async def subscribe_notify(data: NotifyEmailCreate):
     """Subscribe to shop launch notifications"""
-    existing = await db.notify_emails.find_one({"email": data.email})
-    if existing:
-        return {"id": existing["id"], "email": existing["email"], "created_at": existing["created_at"]}
-    
-    notify_id = str(uuid.uuid4())
-    now = datetime.now(timezone.utc).isoformat()
-    
-    notify_doc = {
-        "id": notify_id,
-        "email": data.email,
-        "created_at": now
-    }
-    await db.notify_emails.insert_one(notify_doc)
-    return notify_doc
+    # Returns the existing subscription, or the new one, in one round trip
+    return await upsert_with_retry(lambda: db.notify_emails.find_one_and_update(
+        {"email": data.email},
+        {"$setOnInsert": {"id": str(uuid.uuid4()), "created_at": datetime.now(timezone.utc).isoformat()}},
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    ))
 
 @api_router.get("/notify/subscribers", response_model=List[NotifyEmailResponse])
 async def get_notify_subscribers(user: dict = Depends(get_admin_user)):
@@ -1493,16 +3141,10 @@ async def update_my_profile(profile_data: ProfileUpdate, user: dict = Depends(ge
     """Update current user's profile"""
     now = datetime.now(timezone.utc).isoformat()
     
-    profile = await db.profiles.find_one({"user_id": user["id"]})
-    
     update_data = {k: v for k, v in profile_data.model_dump().items() if v is not None}
     update_data["updated_at"] = now
     
-    if profile:
-        await db.profiles.update_one({"user_id": user["id"]}, {"$set": update_data})
-    else:
-        update_data["user_id"] = user["id"]
-        await db.profiles.insert_one(update_data)
+    await upsert_with_retry(lambda: db.profiles.update_one({"user_id": user["id"]}, {"$set": update_data}, upsert=True))
     
     return await get_user_profile(user["id"])
 
@@ -1520,32 +3162,102 @@ async def get_my_notifications(user: dict = Depends(get_admin_user)):
 @api_router.get("/notifications/unread-count")
 async def get_unread_notification_count(user: dict = Depends(get_admin_user)):
     """Get count of unread notifications"""
-    count = await db.notifications.count_documents({
-        "recipient_admin_id": user["id"],
-        "read_at": None
-    })
+    count = await count_unread_notifications(user["id"])
     return {"unread_count": count}
 
+@api_router.post("/notifications/stream-ticket")
+async def create_stream_ticket(user: dict = Depends(get_admin_user)):
+    """Issue a single-use ticket for opening the notification stream (admin only)"""
+    ticket = secrets.token_urlsafe(32)
+    await db.stream_tickets.insert_one({
+        "ticket_hash": hashlib.sha256(ticket.encode()).hexdigest(),
+        "user_id": user["id"],
+        "expires_at": datetime.now(timezone.utc) + timedelta(seconds=NOTIFICATION_STREAM_TICKET_SECONDS)
+    })
+    return {"ticket": ticket, "expires_in": NOTIFICATION_STREAM_TICKET_SECONDS}
+
+async def get_stream_admin(request: Request) -> dict:
+    """Authenticate an admin for SSE with a Bearer header or a single-use ?ticket="""
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        return await get_admin_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=authorization[7:]))
+    
+    ticket = request.query_params.get("ticket")
+    if not ticket:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    claimed = await db.stream_tickets.find_one_and_delete({
+        "ticket_hash": hashlib.sha256(ticket.encode()).hexdigest(),
+        "expires_at": {"$gt": datetime.now(timezone.utc)}
+    })
+    if not claimed:
+        raise HTTPException(status_code=401, detail="Invalid or expired stream ticket")
+    user = await db.users.find_one({"id": claimed["user_id"]}, {"_id": 0})
+    if not user or not user.get("is_admin"):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@api_router.get("/notifications/stream")
+async def stream_notifications(request: Request, user: dict = Depends(get_stream_admin)):
+    """Server-Sent Events stream of new notifications and unread-count changes (admin only)"""
+    queue = notification_broker.subscribe(user["id"])
+    
+    async def event_stream():
+        try:
+            count = await count_unread_notifications(user["id"])
+            yield format_sse("unread_count", {"type": "unread_count", "unread_count": count})
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=NOTIFICATION_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": heartbeat\n\n"
+                    continue
+                yield format_sse(event["type"], event)
+        finally:
+            notification_broker.unsubscribe(user["id"], queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @api_router.post("/notifications/{notification_id}/read")
 async def mark_notification_read(notification_id: str, user: dict = Depends(get_admin_user)):
     """Mark a notification as read"""
     now = datetime.now(timezone.utc).isoformat()
     result = await db.notifications.update_one(
-        {"id": notification_id, "recipient_admin_id": user["id"]},
+        {"id": notification_id, "recipient_admin_id": user["id"], "read_at": None},
         {"$set": {"read_at": now}}
     )
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Notification not found")
+    if result.modified_count == 0:
+        # Either missing or already read; only the former is an error
+        exists = await db.notifications.find_one(
+            {"id": notification_id, "recipient_admin_id": user["id"]}, {"_id": 1}
+        )
+        if not exists:
+            raise HTTPException(status_code=404, detail="Notification not found")
+        return {"message": "Notification marked as read"}
+    await adjust_unread_counters({user["id"]: -1})
+    if not NOTIFICATIONS_CHANGE_STREAM:
+        await push_notification_update(user["id"])
     return {"message": "Notification marked as read"}
 
 @api_router.post("/notifications/read-all")
 async def mark_all_notifications_read(user: dict = Depends(get_admin_user)):
     """Mark all notifications as read"""
     now = datetime.now(timezone.utc).isoformat()
-    await db.notifications.update_many(
+    result = await db.notifications.update_many(
         {"recipient_admin_id": user["id"], "read_at": None},
         {"$set": {"read_at": now}}
     )
+    await adjust_unread_counters({user["id"]: -result.modified_count})
+    if not NOTIFICATIONS_CHANGE_STREAM:
+        await push_notification_update(user["id"])
     return {"message": "All notifications marked as read"}
 
 # ============ HEALTH CHECK ============
@@ -1572,10 +3284,7 @@ async def get_auth_status(user: dict = Depends(get_admin_user)):
     # Get pending counts
     pending_posts = await db.posts.count_documents({"status": "pending"})
     pending_actions = await db.actions.count_documents({"status": "pending"})
-    unread_notifications = await db.notifications.count_documents({
-        "recipient_admin_id": user["id"],
-        "read_at": None
-    })
+    unread_notifications = await count_unread_notifications(user["id"])
     
     return {
         "user_id": user["id"],
@@ -1642,23 +3351,11 @@ async def get_all_users(
         if "last_login_at" not in u:
             u["last_login_at"] = None
     
-    return users
+    return fast_response(users)
 
-@api_router.post("/admin/users/{user_id}/reset-password")
+@api_router.post("/admin/users/{user_id}/reset-password", dependencies=[Depends(admin_reset_rate_limit)])
 async def admin_reset_user_password(user_id: str, admin: dict = Depends(get_admin_user), request: Request = None):
-    """Generate a password reset link for a user (admin only)"""
-    # Rate limit
-    if not check_rate_limit(f"admin_reset:{admin['id']}"):
-        await create_audit_log(
-            action="password_reset_request",
-            admin_id=admin["id"],
-            admin_email=admin["email"],
-            target_user_id=user_id,
-            details="Rate limited",
-            outcome="blocked"
-        )
-        raise HTTPException(status_code=429, detail="Too many reset requests. Please wait before trying again.")
-    
+    """Generate a password reset link for a user (admin only, rate limited)"""
     # Find target user
     target_user = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
     if not target_user:
@@ -1708,6 +3405,24 @@ async def admin_reset_user_password(user_id: str, admin: dict = Depends(get_admi
         "note": "Email sending not configured. Share this one-time link securely with the user."
     }
 
+@api_router.post("/admin/users/{user_id}/revoke-sessions")
+async def admin_revoke_user_sessions(user_id: str, admin: dict = Depends(get_admin_user)):
+    """Sign a user out everywhere by revoking their tokens (admin only)"""
+    target_user = await revoke_user_tokens(user_id)
+    if not target_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    await create_audit_log(
+        action="revoke_sessions",
+        admin_id=admin["id"],
+        admin_email=admin["email"],
+        target_user_id=user_id,
+        target_email=target_user["email"],
+        details=f"Token generation bumped to {token_generation(target_user)}",
+        outcome="success"
+    )
+    return {"message": "User sessions revoked"}
+
 @api_router.get("/admin/audit-logs")
 async def get_audit_logs(
     admin: dict = Depends(get_admin_user),
@@ -1720,7 +3435,7 @@ async def get_audit_logs(
         query["action"] = action
     
     logs = await db.audit_logs.find(query, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(limit)
-    return logs
+    return fast_response(logs)
 
 @api_router.put("/admin/users/{user_id}")
 async def update_user_admin(user_id: str, user_data: UserUpdate, admin: dict = Depends(get_admin_user)):
@@ -1730,6 +3445,8 @@ async def update_user_admin(user_id: str, user_data: UserUpdate, admin: dict = D
     
     update_data = {k: v for k, v in user_data.model_dump().items() if v is not None}
     await db.users.update_one({"id": user_id}, {"$set": update_data})
+    if "is_admin" in update_data:
+        invalidate_admin_roster()
     return {"message": "User updated"}
 
 # ============ ANALYTICS ROUTES ============
@@ -1744,10 +3461,218 @@ class AnalyticsEvent(BaseModel):
     utm_medium: Optional[str] = None
     utm_campaign: Optional[str] = None
     metadata: Optional[dict] = None
+    sample_rate: Optional[float] = None  # Rate the client already sampled at, if any
+
+# Ingest-time enrichment: derived fields are computed once when an event is
+# stored so the dashboard can group on indexed fields instead of re-parsing
+# every referrer and timestamp on each load.
+ANALYTICS_BOT_POLICY = os.environ.get('ANALYTICS_BOT_POLICY', 'drop').lower()  # drop, sample, keep
+ANALYTICS_BOT_SAMPLE_RATE = float(os.environ.get('ANALYTICS_BOT_SAMPLE_RATE', '0.1'))
+# Browsers always send a User-Agent, so by default a request without one is
+# classified as a bot (and dropped under the default policy). Set to false if a
+# proxy or privacy tool in front of the site strips the header.
+ANALYTICS_EMPTY_USER_AGENT_IS_BOT = os.environ.get('ANALYTICS_EMPTY_USER_AGENT_IS_BOT', 'true').lower() == 'true'
+ANALYTICS_MAX_PATH_LENGTH = 512
+ANALYTICS_BACKFILL_BATCH_SIZE = 1000
+ANALYTICS_MAX_CLOCK_SKEW = timedelta(hours=12)
+
+BOT_USER_AGENT_PATTERN = re.compile(
+    r"bot|crawl|spider|slurp|archiver|facebookexternalhit|embedly|preview|"
+    r"headless|phantomjs|lighthouse|pingdom|uptime|monitor|curl|wget|"
+    r"python-requests|python-urllib|aiohttp|httpx|go-http-client|java/|okhttp|scrapy",
+    re.IGNORECASE
+)
+
+def normalize_page_path(page_path: Optional[str]) -> str:
+    """Normalize a page path: drop query/fragment, collapse slashes, strip trailing slash"""
+    if not page_path:
+        return "/"
+    path = urlsplit(page_path).path or "/"
+    path = re.sub(r"/{2,}", "/", path)
+    if not path.startswith("/"):
+        path = "/" + path
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+    return path[:ANALYTICS_MAX_PATH_LENGTH]
+
+def referrer_host(referrer: Optional[str]) -> str:
+    """Reduce a referrer URL to its host, or '(direct)' when there is none"""
+    if not referrer:
+        return "(direct)"
+    try:
+        host = urlsplit(referrer).netloc.lower()
+    except ValueError:
+        host = ""
+    return host or referrer[:ANALYTICS_MAX_PATH_LENGTH]
+
+def parse_event_timestamp(timestamp: Optional[str], fallback: datetime) -> datetime:
+    """Parse a client-supplied ISO timestamp as UTC, falling back to server time if invalid"""
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return fallback
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    parsed = parsed.astimezone(timezone.utc)
+    # Client clocks can be wildly off; keep events near the time they were received
+    # so days that have already been archived never receive late events
+    if abs(parsed - fallback) > ANALYTICS_MAX_CLOCK_SKEW:
+        return fallback
+    return parsed
+
+def is_bot_user_agent(user_agent: Optional[str]) -> bool:
+    """Classify a request as a bot/crawler from its User-Agent header"""
+    if not user_agent:
+        return ANALYTICS_EMPTY_USER_AGENT_IS_BOT
+    return bool(BOT_USER_AGENT_PATTERN.search(user_agent))
+
+def enrich_analytics_fields(page_path: Optional[str], referrer: Optional[str], timestamp: Optional[str],
+                            received_at: datetime) -> dict:
+    """Compute derived, indexable fields for an analytics event"""
+    occurred_at = parse_event_timestamp(timestamp, received_at)
+    return {
+        "path_normalized": normalize_page_path(page_path),
+        "referrer_host": referrer_host(referrer),
+        "occurred_at": occurred_at,
+        "day_bucket": occurred_at.strftime("%Y-%m-%d"),
+        "hour_bucket": occurred_at.strftime("%Y-%m-%dT%H"),
+    }
+
+def should_store_bot_event() -> bool:
+    """Apply the configured bot policy (drop, sample or keep)"""
+    if ANALYTICS_BOT_POLICY == "keep":
+        return True
+    if ANALYTICS_BOT_POLICY == "sample":
+        return random.random() < ANALYTICS_BOT_SAMPLE_RATE
+    return False
+
+# ============ ANALYTICS SAMPLING & INGEST QUEUE ============
+
+# Events are sampled per event name and stored with weight = 1 / sample rate so
+# aggregations stay unbiased. Stored events go through a bounded in-process
+# queue flushed with insert_many; when the queue backs up or Mongo slows down
+# the sampler tightens every rate by a shared load factor.
+ANALYTICS_DEFAULT_SAMPLE_RATE = float(os.environ.get('ANALYTICS_DEFAULT_SAMPLE_RATE', '1.0'))
+ANALYTICS_SAMPLE_RATES = json.loads(os.environ.get('ANALYTICS_SAMPLE_RATES', '{}'))  # {"click": 0.5, ...}
+ANALYTICS_MIN_LOAD_FACTOR = 0.01
+ANALYTICS_QUEUE_MAX = int(os.environ.get('ANALYTICS_QUEUE_MAX', '10000'))
+ANALYTICS_QUEUE_HIGH_WATER = int(os.environ.get('ANALYTICS_QUEUE_HIGH_WATER', '2000'))
+ANALYTICS_LATENCY_THRESHOLD_MS = float(os.environ.get('ANALYTICS_LATENCY_THRESHOLD_MS', '250'))
+ANALYTICS_FLUSH_BATCH_SIZE = 500
+ANALYTICS_FLUSH_INTERVAL_SECONDS = 0.5
+
+class AnalyticsSampler:
+    """Per-event-name sample rates scaled by a load factor that reacts to ingest pressure"""
+    
+    def __init__(self, default_rate: float, rates: dict):
+        self.default_rate = default_rate
+        self.rates = rates
+        self.load_factor = 1.0
+        self.latency_ms = 0.0  # EWMA of insert_many latency
+        self.shed = 0
+    
+    def base_rate(self, event_name: str) -> float:
+        return float(self.rates.get(event_name, self.default_rate))
+    
+    def rate_for(self, event_name: str) -> float:
+        return max(ANALYTICS_MIN_LOAD_FACTOR * self.base_rate(event_name),
+                   min(1.0, self.base_rate(event_name) * self.load_factor))
+    
+    def observe(self, queue_depth: int, latency_ms: Optional[float] = None):
+        """Tighten rates quickly under pressure, relax them slowly once it passes"""
+        if latency_ms is not None:
+            self.latency_ms = 0.8 * self.latency_ms + 0.2 * latency_ms
+        overloaded = queue_depth > ANALYTICS_QUEUE_HIGH_WATER or self.latency_ms > ANALYTICS_LATENCY_THRESHOLD_MS
+        if overloaded:
+            self.load_factor = max(ANALYTICS_MIN_LOAD_FACTOR, self.load_factor / 2)
+        else:
+            self.load_factor = min(1.0, self.load_factor * 1.1)
+    
+    def config(self, event_names) -> dict:
+        return {
+            "default_rate": self.rate_for(""),
+            "sample_rates": {name: self.rate_for(name) for name in event_names},
+            "load_factor": round(self.load_factor, 4),
+        }
+
+analytics_sampler = AnalyticsSampler(ANALYTICS_DEFAULT_SAMPLE_RATE, ANALYTICS_SAMPLE_RATES)
+analytics_queue: asyncio.Queue = asyncio.Queue(maxsize=ANALYTICS_QUEUE_MAX)
+KNOWN_ANALYTICS_EVENTS = ("pageview", "click", "page_exit")
+
+def sample_analytics_event(event_name: str, client_rate: Optional[float]) -> Optional[float]:
+    """Decide whether to keep an event. Returns its weight, or None to drop it.
+    
+    Clients that already sampled report their rate; the server only applies the
+    remaining reduction so the overall keep probability is min(client, server).
+    """
+    server_rate = analytics_sampler.rate_for(event_name)
+    client_rate = client_rate if client_rate and 0 < client_rate <= 1 else 1.0
+    # The endpoint is public: never accept a rate below the one the server currently
+    # advertises, or a forged sample_rate=1e-9 would count one event a billion times
+    client_rate = max(client_rate, server_rate)
+    keep_probability = min(1.0, server_rate / client_rate)
+    if keep_probability < 1.0 and random.random() >= keep_probability:
+        return None
+    return 1.0 / (client_rate * keep_probability)
+
+def enqueue_analytics_event(event_doc: dict) -> bool:
+    """Queue an event for batched insertion; sheds it if the queue is full"""
+    try:
+        analytics_queue.put_nowait(event_doc)
+        return True
+    except asyncio.QueueFull:
+        analytics_sampler.shed += 1
+        analytics_sampler.observe(analytics_queue.qsize())
+        return False
+
+async def flush_analytics_queue() -> int:
+    """Insert everything currently queued (up to one batch)"""
+    batch = []
+    while len(batch) < ANALYTICS_FLUSH_BATCH_SIZE:
+        try:
+            batch.append(analytics_queue.get_nowait())
+        except asyncio.QueueEmpty:
+            break
+    if not batch:
+        analytics_sampler.observe(0)
+        return 0
+    start = time.perf_counter()
+    try:
+        await db.analytics_events.insert_many(batch, ordered=False)
+    except Exception as e:
+        logger.error(f"Analytics flush failed ({len(batch)} events dropped): {str(e)}")
+    analytics_sampler.observe(analytics_queue.qsize(), (time.perf_counter() - start) * 1000)
+    return len(batch)
+
+async def run_analytics_flusher():
+    """Background writer for queued analytics events"""
+    while True:
+        try:
+            flushed = await flush_analytics_queue()
+        except Exception as e:
+            logger.error(f"Analytics flusher error: {str(e)}")
+            flushed = 0
+        if flushed < ANALYTICS_FLUSH_BATCH_SIZE:
+            await asyncio.sleep(ANALYTICS_FLUSH_INTERVAL_SECONDS)
+
+@api_router.get("/analytics/config")
+async def get_analytics_config():
+    """Current sample rates for clients (public endpoint)"""
+    event_names = set(KNOWN_ANALYTICS_EVENTS) | set(ANALYTICS_SAMPLE_RATES)
+    return analytics_sampler.config(sorted(event_names))
 
 @api_router.post("/analytics/event")
-async def track_analytics_event(event: AnalyticsEvent):
+async def track_analytics_event(event: AnalyticsEvent, request: Request):
     """Track an analytics event (public endpoint, no auth required)"""
+    is_bot = is_bot_user_agent(request.headers.get("user-agent"))
+    if is_bot and not should_store_bot_event():
+        return {"status": "ok"}
+    
+    weight = sample_analytics_event(event.event_name, event.sample_rate)
+    if weight is None:
+        return {"status": "ok"}
+    
+    received_at = datetime.now(timezone.utc)
     event_doc = {
         "id": str(uuid.uuid4()),
         "event_name": event.event_name,
@@ -1759,90 +3684,150 @@ async def track_analytics_event(event: AnalyticsEvent):
         "utm_medium": event.utm_medium,
         "utm_campaign": event.utm_campaign,
         "metadata": event.metadata or {},
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "is_bot": is_bot,
+        "weight": weight,
+        "created_at": received_at.isoformat()
     }
-    await db.analytics_events.insert_one(event_doc)
+    event_doc.update(enrich_analytics_fields(event.page_path, event.referrer, event.timestamp, received_at))
+    enqueue_analytics_event(event_doc)
     return {"status": "ok"}
 
+async def backfill_analytics_enrichment():
+    """One-time backfill of derived fields for events stored before ingest-time enrichment"""
+    total = 0
+    while True:
+        legacy = await db.analytics_events.find(
+            {"day_bucket": {"$exists": False}},
+            {"_id": 1, "page_path": 1, "referrer": 1, "timestamp": 1, "created_at": 1}
+        ).limit(ANALYTICS_BACKFILL_BATCH_SIZE).to_list(ANALYTICS_BACKFILL_BATCH_SIZE)
+        if not legacy:
+            break
+        
+        operations = []
+        for e in legacy:
+            received_at = parse_event_timestamp(e.get("created_at"), datetime.now(timezone.utc))
+            fields = enrich_analytics_fields(e.get("page_path"), e.get("referrer"), e.get("timestamp"), received_at)
+            fields["is_bot"] = False  # User-Agent was never recorded for legacy events
+            operations.append(UpdateOne({"_id": e["_id"]}, {"$set": fields}))
+        await db.analytics_events.bulk_write(operations, ordered=False)
+        total += len(operations)
+    
+    if total:
+        logger.info(f"Backfilled derived analytics fields on {total} events")
+    return total
+
+def top_counts(counts: dict, n: int = 10) -> list:
+    """Return the n largest (key, count) pairs, rounding weighted counts"""
+    return [(k, round(c)) for k, c in sorted(counts.items(), key=lambda x: x[1], reverse=True)[:n]]
+
+# Sampled events carry weight = 1 / sample rate; unsampled and legacy events count once
+EVENT_WEIGHT = {"$ifNull": ["$weight", 1]}
+WEIGHT_SUM = {"$sum": EVENT_WEIGHT}
+
+def analytics_facets() -> dict:
+    """$facet stages computing every dashboard dimension in a single pass"""
+    pageview_match = {"$match": {"event_name": "pageview"}}
+    return {
+        "event_counts": [{"$group": {"_id": "$event_name", "count": WEIGHT_SUM}}],
+        "unique_sessions": [
+            {"$match": {"session_id": {"$nin": [None, ""]}}},
+            {"$group": {"_id": "$session_id"}},
+            {"$count": "count"}
+        ],
+        "pages": [pageview_match, {"$group": {"_id": "$path_normalized", "count": WEIGHT_SUM}}],
+        "clicks": [
+            {"$match": {"event_name": "click"}},
+            {"$group": {"_id": {"$ifNull": ["$metadata.button_id", "unknown"]}, "count": WEIGHT_SUM}}
+        ],
+        "referrers": [pageview_match, {"$group": {"_id": "$referrer_host", "count": WEIGHT_SUM}}],
+        "utm_sources": [
+            {"$match": {"event_name": "pageview", "utm_source": {"$nin": [None, ""]}}},
+            {"$group": {"_id": "$utm_source", "count": WEIGHT_SUM}}
+        ],
+        "durations": [
+            {"$match": {"event_name": "page_exit"}},
+            {"$group": {
+                "_id": None,
+                "sum": {"$sum": {"$multiply": [{"$ifNull": ["$metadata.duration_seconds", 0]}, EVENT_WEIGHT]}},
+                "count": WEIGHT_SUM
+            }}
+        ],
+        "daily": [pageview_match, {"$group": {"_id": "$day_bucket", "count": WEIGHT_SUM}}],
+    }
+
+ANALYTICS_COUNTER_FIELDS = ("event_counts", "pages", "clicks", "referrers", "utm_sources", "daily")
+
+def empty_analytics_summary() -> dict:
+    """Accumulator shared by live-event and rollup aggregation"""
+    summary = {field: defaultdict(int) for field in ANALYTICS_COUNTER_FIELDS}
+    summary.update({"unique_sessions": 0, "duration_sum": 0, "duration_count": 0})
+    return summary
+
+def merge_hot_analytics(summary: dict, facets: dict):
+    """Fold $facet output from live events into a summary"""
+    for field in ANALYTICS_COUNTER_FIELDS:
+        for g in facets[field]:
+            summary[field][g["_id"]] += g["count"]
+    if facets["unique_sessions"]:
+        summary["unique_sessions"] += facets["unique_sessions"][0]["count"]
+    if facets["durations"]:
+        summary["duration_sum"] += facets["durations"][0]["sum"] or 0
+        summary["duration_count"] += facets["durations"][0]["count"]
+
+def merge_analytics_rollup(summary: dict, rollup: dict):
+    """Fold a daily rollup of archived events into a summary"""
+    for field in ("event_counts", "pages", "clicks", "referrers", "utm_sources"):
+        for g in rollup.get(field, []):
+            summary[field][g["key"]] += g["count"]
+    pageviews = sum(g["count"] for g in rollup.get("event_counts", []) if g["key"] == "pageview")
+    if pageviews:
+        summary["daily"][rollup["day"]] += pageviews
+    # Sessions are distinct per day in rollups, so multi-day totals over archived days are an upper bound
+    summary["unique_sessions"] += rollup.get("unique_sessions", 0)
+    summary["duration_sum"] += rollup.get("duration_sum", 0)
+    summary["duration_count"] += rollup.get("duration_count", 0)
+
 @api_router.get("/admin/analytics")
 async def get_analytics(
     admin: dict = Depends(get_admin_user),
     days: int = 30
 ):
-    """Get analytics summary (admin only)"""
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-    cutoff_str = cutoff.isoformat()
-    
-    # Get all events in time range
-    events = await db.analytics_events.find(
-        {"timestamp": {"$gte": cutoff_str}},
+    """Get analytics summary (admin only). Archived days are served from their rollups."""
+    # One day-aligned cutoff for both sources: a rollup covers a whole UTC day, so the
+    # live events must start at the same midnight or the boundary day is partly counted
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    cutoff_day = cutoff.strftime("%Y-%m-%d")
+    summary = empty_analytics_summary()
+    
+    # Live events still in the hot collection
+    pipeline = [
+        {"$match": {"occurred_at": {"$gte": cutoff}, "is_bot": {"$ne": True}}},
+        {"$facet": analytics_facets()}
+    ]
+    facets = (await db.analytics_events.aggregate(pipeline).to_list(1))[0]
+    merge_hot_analytics(summary, facets)
+    
+    # Days that have been moved to the columnar archive
+    rollups = await db.analytics_rollups.find(
+        {"day": {"$gte": cutoff_day}, "status": "complete"},
         {"_id": 0}
-    ).to_list(10000)
-    
-    # Calculate summary stats
-    pageviews = [e for e in events if e.get("event_name") == "pageview"]
-    clicks = [e for e in events if e.get("event_name") == "click"]
-    page_exits = [e for e in events if e.get("event_name") == "page_exit"]
-    
-    # Unique sessions
-    unique_sessions = len(set(e.get("session_id") for e in events if e.get("session_id")))
-    
-    # Top pages
-    page_counts = {}
-    for e in pageviews:
-        path = e.get("page_path", "/")
-        page_counts[path] = page_counts.get(path, 0) + 1
-    top_pages = sorted(page_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-    
-    # Top clicks
-    click_counts = {}
-    for e in clicks:
-        button_id = e.get("metadata", {}).get("button_id", "unknown")
-        click_counts[button_id] = click_counts.get(button_id, 0) + 1
-    top_clicks = sorted(click_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-    
-    # Top referrers
-    referrer_counts = {}
-    for e in pageviews:
-        ref = e.get("referrer") or "(direct)"
-        # Simplify referrer
-        if ref != "(direct)":
-            try:
-                from urllib.parse import urlparse
-                parsed = urlparse(ref)
-                ref = parsed.netloc or ref
-            except:
-                pass
-        referrer_counts[ref] = referrer_counts.get(ref, 0) + 1
-    top_referrers = sorted(referrer_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-    
-    # Top UTM sources
-    utm_counts = {}
-    for e in pageviews:
-        source = e.get("utm_source")
-        if source:
-            utm_counts[source] = utm_counts.get(source, 0) + 1
-    top_utm_sources = sorted(utm_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-    
-    # Average time on page (from page_exit events)
-    durations = [e.get("metadata", {}).get("duration_seconds", 0) for e in page_exits]
-    avg_duration = sum(durations) / len(durations) if durations else 0
-    
-    # Daily pageview counts for chart
-    daily_views = {}
-    for e in pageviews:
-        try:
-            date = e.get("timestamp", "")[:10]
-            daily_views[date] = daily_views.get(date, 0) + 1
-        except:
-            pass
-    daily_views_sorted = sorted(daily_views.items())
+    ).to_list(None)
+    for rollup in rollups:
+        merge_analytics_rollup(summary, rollup)
+    
+    event_counts = summary["event_counts"]
+    avg_duration = summary["duration_sum"] / summary["duration_count"] if summary["duration_count"] else 0
+    top_pages = top_counts(summary["pages"])
+    top_clicks = top_counts(summary["clicks"])
+    top_referrers = top_counts(summary["referrers"])
+    top_utm_sources = top_counts(summary["utm_sources"])
+    daily_views_sorted = sorted((d, round(c)) for d, c in summary["daily"].items())
     
     return {
         "period_days": days,
-        "total_pageviews": len(pageviews),
-        "total_clicks": len(clicks),
-        "unique_sessions": unique_sessions,
+        "total_pageviews": round(event_counts.get("pageview", 0)),
+        "total_clicks": round(event_counts.get("click", 0)),
+        "unique_sessions": summary["unique_sessions"],
         "avg_time_on_page_seconds": round(avg_duration, 1),
         "top_pages": [{"path": p, "count": c} for p, c in top_pages],
         "top_clicks": [{"button_id": b, "count": c} for b, c in top_clicks],
@@ -1851,6 +3836,440 @@ async def get_analytics(
         "daily_pageviews": [{"date": d, "count": c} for d, c in daily_views_sorted],
     }
 
+# ============ ANALYTICS ARCHIVAL ============
+
+# Events older than the hot horizon are written to compressed Parquet files
+# (one directory per UTC day) and removed from Mongo. A daily rollup is kept
+# in analytics_rollups so the dashboard can still cover archived days.
+ANALYTICS_HOT_DAYS = max(2, int(os.environ.get('ANALYTICS_HOT_DAYS', '90')))
+ANALYTICS_ARCHIVE_ENABLED = os.environ.get('ANALYTICS_ARCHIVE_ENABLED', 'false').lower() == 'true'
+ANALYTICS_ARCHIVE_INTERVAL_HOURS = float(os.environ.get('ANALYTICS_ARCHIVE_INTERVAL_HOURS', '6'))
+ANALYTICS_ARCHIVE_DIR = Path(os.environ.get('ANALYTICS_ARCHIVE_DIR', str(ROOT_DIR / "analytics_archive")))
+ANALYTICS_ARCHIVE_BATCH_SIZE = 50000
+ANALYTICS_ARCHIVE_CLAIM_MINUTES = 60
+ANALYTICS_ARCHIVE_COLUMNS = [
+    "id", "event_name", "page_path", "path_normalized", "referrer", "referrer_host", "session_id",
+    "timestamp", "occurred_at", "day_bucket", "hour_bucket", "utm_source", "utm_medium", "utm_campaign",
+    "button_id", "duration_seconds", "metadata", "is_bot", "weight", "created_at"
+]
+
+analytics_archive_lock = asyncio.Lock()
+
+def analytics_archive_day_dir(day: str) -> Path:
+    return ANALYTICS_ARCHIVE_DIR / f"day={day}"
+
+def events_to_frame(events: list):
+    """Flatten event documents into a DataFrame with a fixed column set"""
+    rows = []
+    for e in events:
+        metadata = e.get("metadata") or {}
+        row = {column: e.get(column) for column in ANALYTICS_ARCHIVE_COLUMNS}
+        row["button_id"] = metadata.get("button_id")
+        row["duration_seconds"] = metadata.get("duration_seconds")
+        row["metadata"] = json.dumps(metadata, default=str)
+        row["is_bot"] = bool(e.get("is_bot"))
+        rows.append(row)
+    frame = pd.DataFrame(rows, columns=ANALYTICS_ARCHIVE_COLUMNS)
+    frame["duration_seconds"] = pd.to_numeric(frame["duration_seconds"], errors="coerce")
+    return frame
+
+def write_archive_part(day: str, events: list) -> Path:
+    """Write one batch of events as a zstd-compressed Parquet part (atomic rename)"""
+    day_dir = analytics_archive_day_dir(day)
+    day_dir.mkdir(parents=True, exist_ok=True)
+    part = day_dir / f"part-{uuid.uuid4().hex}.parquet"
+    tmp = part.with_suffix(".tmp")
+    events_to_frame(events).to_parquet(tmp, compression="zstd", index=False)
+    tmp.rename(part)
+    return part
+
+def read_archived_events(day: str, columns: Optional[list] = None):
+    """Load archived events for a day, or None if the day was never archived"""
+    day_dir = analytics_archive_day_dir(day)
+    parts = sorted(day_dir.glob("part-*.parquet")) if day_dir.exists() else []
+    if not parts:
+        return None
+    if columns and "id" not in columns:
+        columns = ["id"] + list(columns)
+    frame = pd.concat([pd.read_parquet(part, columns=columns) for part in parts], ignore_index=True)
+    # A crash between writing a part and deleting its events can archive an event twice
+    return frame.drop_duplicates("id")
+
+def summarize_archived_day(day: str) -> dict:
+    """Build the daily rollup document from a day's archive files"""
+    frame = read_archived_events(day)
+    archived_events = len(frame)
+    # Parts written before sampling have no weight column; those events count once
+    weights = frame["weight"].fillna(1.0) if "weight" in frame else 1.0
+    frame = frame.assign(weight=weights)
+    frame = frame[~frame["is_bot"]]
+    pageviews = frame[frame["event_name"] == "pageview"]
+    clicks = frame[frame["event_name"] == "click"].assign(button_id=lambda f: f["button_id"].fillna("unknown"))
+    exits = frame[frame["event_name"] == "page_exit"]
+    utm = pageviews[pageviews["utm_source"].fillna("") != ""]
+    
+    def as_counts(subset, column: str) -> list:
+        totals = subset.groupby(column)["weight"].sum().sort_values(ascending=False)
+        return [{"key": k, "count": round(float(c), 3)} for k, c in totals.items()]
+    
+    return {
+        "day": day,
+        "event_counts": as_counts(frame, "event_name"),
+        "unique_sessions": int(frame.loc[frame["session_id"].fillna("") != "", "session_id"].nunique()),
+        "pages": as_counts(pageviews, "path_normalized"),
+        "clicks": as_counts(clicks, "button_id"),
+        "referrers": as_counts(pageviews, "referrer_host"),
+        "utm_sources": as_counts(utm, "utm_source"),
+        "duration_sum": float((exits["duration_seconds"].fillna(0) * exits["weight"]).sum()),
+        "duration_count": float(exits["weight"].sum()),
+        "archived_events": archived_events,
+    }
+
+async def archive_analytics_day(day: str) -> int:
+    """Move one UTC day of events into the archive. Returns the number of events moved."""
+    now = datetime.now(timezone.utc)
+    stale = (now - timedelta(minutes=ANALYTICS_ARCHIVE_CLAIM_MINUTES)).isoformat()
+    # Claim the day so concurrent workers don't archive it twice
+    try:
+        claim = await db.analytics_rollups.update_one(
+            {"day": day, "status": {"$ne": "complete"},
+             "$or": [{"claimed_at": {"$exists": False}}, {"claimed_at": {"$lt": stale}}]},
+            {"$set": {"status": "archiving", "claimed_at": now.isoformat()}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return 0
+    if claim.matched_count == 0 and claim.upserted_id is None:
+        return 0
+    
+    moved = 0
+    while True:
+        events = await db.analytics_events.find(
+            {"day_bucket": day}, {"_id": 0}
+        ).limit(ANALYTICS_ARCHIVE_BATCH_SIZE).to_list(ANALYTICS_ARCHIVE_BATCH_SIZE)
+        if not events:
+            break
+        await asyncio.to_thread(write_archive_part, day, events)
+        ids = [e["id"] for e in events]
+        await db.analytics_events.delete_many({"day_bucket": day, "id": {"$in": ids}})
+        moved += len(events)
+    
+    rollup = await asyncio.to_thread(summarize_archived_day, day) if analytics_archive_day_dir(day).exists() else None
+    if rollup is None:
+        await db.analytics_rollups.delete_one({"day": day, "status": "archiving"})
+        return moved
+    rollup.update({"status": "complete", "archived_at": datetime.now(timezone.utc).isoformat()})
+    await db.analytics_rollups.update_one({"day": day}, {"$set": rollup, "$unset": {"claimed_at": ""}})
+    logger.info(f"Archived {moved} analytics events for {day}")
+    return moved
+
+async def archive_analytics_events(hot_days: int = ANALYTICS_HOT_DAYS) -> dict:
+    """Archive every full day older than the hot horizon"""
+    if pd is None:
+        raise RuntimeError("pandas and pyarrow are required for analytics archival")
+    cutoff_day = (datetime.now(timezone.utc) - timedelta(days=hot_days)).strftime("%Y-%m-%d")
+    async with analytics_archive_lock:
+        days = sorted(await db.analytics_events.distinct("day_bucket", {"day_bucket": {"$lt": cutoff_day}}))
+        moved = 0
+        for day in days:
+            moved += await archive_analytics_day(day)
+    return {"archived_days": len(days), "archived_events": moved, "cutoff_day": cutoff_day}
+
+async def run_analytics_archival_loop():
+    """Background lifecycle job (enabled with ANALYTICS_ARCHIVE_ENABLED=true)"""
+    while True:
+        try:
+            result = await archive_analytics_events()
+            if result["archived_events"]:
+                logger.info(f"Analytics archival: {result}")
+        except Exception as e:
+            logger.error(f"Analytics archival failed: {str(e)}")
+        await asyncio.sleep(ANALYTICS_ARCHIVE_INTERVAL_HOURS * 3600)
+
+@api_router.post("/admin/analytics/archive")
+async def trigger_analytics_archive(admin: dict = Depends(get_admin_user), hot_days: int = ANALYTICS_HOT_DAYS):
+    """Run the analytics archival job now (admin only)"""
+    if pd is None:
+        raise HTTPException(status_code=503, detail="Analytics archival requires pandas and pyarrow")
+    if hot_days < 2:
+        raise HTTPException(status_code=400, detail="hot_days must be at least 2")
+    result = await archive_analytics_events(hot_days)
+    await create_audit_log(
+        action="analytics_archive",
+        admin_id=admin["id"],
+        admin_email=admin["email"],
+        details=f"Archived {result['archived_events']} events older than {result['cutoff_day']}",
+        outcome="success"
+    )
+    return result
+
+@api_router.get("/admin/analytics/archive")
+async def list_analytics_archive(admin: dict = Depends(get_admin_user)):
+    """List archived analytics days with their rollup totals (admin only)"""
+    rollups = await db.analytics_rollups.find(
+        {"status": "complete"},
+        {"_id": 0, "day": 1, "archived_events": 1, "archived_at": 1}
+    ).sort("day", -1).to_list(None)
+    return {"hot_days": ANALYTICS_HOT_DAYS, "days": rollups}
+
+# ============ DATA EXPORT ============
+
+# Exports stream straight from a Motor cursor in batches so memory stays flat
+# regardless of how many documents are exported.
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+EXPORT_DATASETS = {
+    "analytics_events": {"time_field": "created_at", "columns": ANALYTICS_ARCHIVE_COLUMNS},
+    "audit_logs": {"time_field": "timestamp", "columns": list(AuditLogResponse.model_fields)},
+    "email_logs": {
+        "time_field": "created_at",
+        "columns": ["id", "to_email", "template_type", "entity_type", "entity_id", "status", "error", "created_at"]
+    },
+    "notify_emails": {"time_field": "created_at", "columns": list(NotifyEmailResponse.model_fields)},
+    "rsvps": {"time_field": "created_at", "columns": list(RSVPResponse.model_fields)},
+    "action_participants": {"time_field": "created_at", "columns": list(ActionParticipantResponse.model_fields)},
+}
+
+def export_json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def flatten_analytics_row(doc: dict) -> dict:
+    """Give live analytics events the same flat shape as archived ones"""
+    metadata = doc.get("metadata")
+    if isinstance(metadata, dict):
+        doc.setdefault("button_id", metadata.get("button_id"))
+        doc.setdefault("duration_seconds", metadata.get("duration_seconds"))
+    return doc
+
+class ExportEncoder:
+    """Incrementally encode documents as NDJSON or CSV, optionally gzip-compressed"""
+    
+    def __init__(self, fmt: str, columns: list, compress: bool):
+        self.fmt = fmt
+        self.columns = columns
+        self.buffer = io.StringIO()
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        self.csv_writer = csv.writer(self.buffer) if fmt == "csv" else None
+        if self.csv_writer:
+            self.csv_writer.writerow(columns)
+    
+    def write(self, doc: dict):
+        if self.csv_writer:
+            row = []
+            for column in self.columns:
+                value = doc.get(column)
+                if isinstance(value, (dict, list)):
+                    value = json.dumps(value, default=export_json_default)
+                elif isinstance(value, datetime):
+                    value = value.isoformat()
+                row.append("" if value is None else value)
+            self.csv_writer.writerow(row)
+        else:
+            self.buffer.write(json.dumps(doc, default=export_json_default))
+            self.buffer.write("\n")
+    
+    def ready(self) -> bool:
+        return self.buffer.tell() >= EXPORT_CHUNK_BYTES
+    
+    def drain(self, final: bool = False) -> bytes:
+        data = self.buffer.getvalue().encode("utf-8")
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        if self.compressor:
+            data = self.compressor.compress(data)
+            if final:
+                data += self.compressor.flush()
+        return data
+
+def iter_archived_export_rows(day: str, since: Optional[str], until: Optional[str]):
+    """Yield one archived day's export rows one Parquet batch at a time (blocking; drive from a worker thread)"""
+    day_dir = analytics_archive_day_dir(day)
+    parts = sorted(day_dir.glob("part-*.parquet")) if day_dir.exists() else []
+    # A crash between writing a part and deleting its events can archive an event twice
+    seen_ids = set()
+    for part in parts:
+        for batch in pq.ParquetFile(part).iter_batches(batch_size=EXPORT_BATCH_SIZE):
+            rows = []
+            for row in batch.to_pylist():
+                if row["id"] in seen_ids:
+                    continue
+                seen_ids.add(row["id"])
+                created_at = row.get("created_at")
+                if (since and (created_at is None or created_at < since)) or (
+                        until and (created_at is None or created_at >= until)):
+                    continue
+                if isinstance(row.get("metadata"), str):
+                    row["metadata"] = json.loads(row["metadata"])
+                rows.append(row)
+            if rows:
+                yield rows
+
+async def iter_export_chunks(dataset: str, fmt: str, compress: bool, since: Optional[str],
+                             until: Optional[str], include_archive: bool):
+    """Yield encoded chunks of a dataset, batch by batch"""
+    spec = EXPORT_DATASETS[dataset]
+    encoder = ExportEncoder(fmt, spec["columns"], compress)
+    is_analytics = dataset == "analytics_events"
+    
+    query = {}
+    if since or until:
+        query[spec["time_field"]] = {}
+        if since:
+            query[spec["time_field"]]["$gte"] = since
+        if until:
+            query[spec["time_field"]]["$lt"] = until
+    
+    if is_analytics and include_archive and pq is not None:
+        archived_days = await db.analytics_rollups.find(
+            {"status": "complete"}, {"_id": 0, "day": 1}
+        ).sort("day", 1).to_list(None)
+        for rollup in archived_days:
+            if (since and rollup["day"] < since[:10]) or (until and rollup["day"] > until[:10]):
+                continue
+            batches = iter_archived_export_rows(rollup["day"], since, until)
+            while True:
+                rows = await asyncio.to_thread(next, batches, None)
+                if rows is None:
+                    break
+                for row in rows:
+                    encoder.write(row)
+                    if encoder.ready():
+                        yield encoder.drain()
+    
+    cursor = db[dataset].find(query, {"_id": 0}).sort("_id", 1).batch_size(EXPORT_BATCH_SIZE)
+    async for doc in cursor:
+        encoder.write(flatten_analytics_row(doc) if is_analytics else doc)
+        if encoder.ready():
+            yield encoder.drain()
+    
+    yield encoder.drain(final=True)
+
+@api_router.get("/admin/export/{dataset}")
+async def export_dataset(
+    dataset: str,
+    admin: dict = Depends(get_admin_user),
+    format: str = "ndjson",
+    gzip: bool = False,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    include_archive: bool = False
+):
+    """Stream a dataset as NDJSON or CSV, optionally gzip-compressed (admin only)"""
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset. Available: {', '.join(EXPORT_DATASETS)}")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid format. Use 'ndjson' or 'csv'")
+    
+    await create_audit_log(
+        action="data_export",
+        admin_id=admin["id"],
+        admin_email=admin["email"],
+        details=f"Exported {dataset} as {format}" + (" (gzip)" if gzip else ""),
+        outcome="success"
+    )
+    
+    filename = f"{dataset}-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}.{format}"
+    media_type = EXPORT_FORMATS[format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    
+    return StreamingResponse(
+        iter_export_chunks(dataset, format, gzip, since, until, include_archive),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# ============ PROFILER ============
+
+# On-demand sampling profiler. A thread snapshots the event-loop thread's stack
+# every PROFILER_INTERVAL_MS and folds samples into collapsed stacks (the input
+# format of flamegraph.pl and speedscope). Each stack is rooted at the asyncio
+# task that was running, and samples taken while the loop waits in select are
+# labelled idle, so busy time is easy to tell apart.
+PROFILER_MAX_SECONDS = 60
+PROFILER_INTERVAL_MS = float(os.environ.get('PROFILER_INTERVAL_MS', '5'))
+PROFILER_FORMATS = {"collapsed": "text/plain", "json": "application/json"}
+profiler_lock = asyncio.Lock()
+
+def frame_label(code) -> str:
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+def running_task_label(loop) -> str:
+    task = asyncio.tasks._current_tasks.get(loop)
+    if task is None:
+        return "idle"
+    coro = task.get_coro()
+    return f"task:{getattr(coro, '__qualname__', task.get_name())}"
+
+def sample_stacks(thread_id: int, loop, seconds: float, interval: float) -> tuple[dict, int]:
+    """Sample one thread's stack until `seconds` elapse. Returns ({collapsed stack: count}, samples)."""
+    stacks = defaultdict(int)
+    samples = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            labels = []
+            while frame is not None:
+                labels.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            labels.append(running_task_label(loop))
+            stacks[";".join(reversed(labels))] += 1
+            samples += 1
+        time.sleep(interval)
+    return stacks, samples
+
+@api_router.get("/admin/profile")
+async def profile_event_loop(
+    admin: dict = Depends(get_admin_user),
+    seconds: float = 10,
+    format: str = "collapsed"
+):
+    """Sample the event loop for N seconds and return collapsed stacks (admin only)"""
+    if not 0 < seconds <= PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {PROFILER_MAX_SECONDS}")
+    if format not in PROFILER_FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid format. Use 'collapsed' or 'json'")
+    if profiler_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    
+    async with profiler_lock:
+        await create_audit_log(
+            action="profile",
+            admin_id=admin["id"],
+            admin_email=admin["email"],
+            details=f"Sampled event loop for {seconds}s",
+            outcome="success"
+        )
+        stacks, samples = await asyncio.to_thread(
+            sample_stacks, threading.get_ident(), asyncio.get_running_loop(), seconds, PROFILER_INTERVAL_MS / 1000
+        )
+    
+    if format == "json":
+        busy = samples - sum(count for stack, count in stacks.items() if stack.startswith("idle;"))
+        leaf_counts = defaultdict(int)
+        for stack, count in stacks.items():
+            if not stack.startswith("idle;"):
+                leaf_counts[stack.rsplit(";", 1)[-1]] += count
+        top = sorted(leaf_counts.items(), key=lambda item: item[1], reverse=True)[:25]
+        return {
+            "seconds": seconds,
+            "interval_ms": PROFILER_INTERVAL_MS,
+            "samples": samples,
+            "busy_ratio": round(busy / samples, 4) if samples else 0,
+            "top_frames": [{"frame": frame, "samples": count} for frame, count in top],
+            "stacks": dict(stacks),
+        }
+    return PlainTextResponse(
+        "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items())),
+        headers={"Content-Disposition": 'attachment; filename="profile.collapsed"'}
+    )
+
 # ============ SEED DATA ============
 
 class AdminCredentialUpdate(BaseModel):
@@ -1898,6 +4317,7 @@ async def seed_data():
         "created_at": now
     }
     await db.users.insert_one(admin_doc)
+    invalidate_admin_roster()
     
     # Log without exposing credentials
     logger.info(f"Admin user created with email: {admin_email}")
@@ -1927,12 +4347,56 @@ async def update_admin_credentials(
     if not update_data:
         raise HTTPException(status_code=400, detail="No updates provided")
     
-    await db.users.update_one({"id": admin["id"]}, {"$set": update_data})
+    # A password change signs out every other session; either way the caller gets
+    # a fresh token carrying the current email and token generation
+    if "password_hash" in update_data:
+        updated = await revoke_user_tokens(admin["id"], update_data)
+    else:
+        updated = await db.users.find_one_and_update(
+            {"id": admin["id"]}, {"$set": update_data},
+            projection={"_id": 0}, return_document=ReturnDocument.AFTER
+        )
+    if "email" in update_data:
+        invalidate_admin_roster()
     
     # Log without exposing credentials
     logger.info(f"Admin credentials updated for user ID: {admin['id']}")
     
-    return {"message": "Credentials updated successfully"}
+    return {
+        "message": "Credentials updated successfully",
+        "token": create_token(updated["id"], updated["email"], updated["is_admin"], token_generation(updated))
+    }
+
+# ============ METRICS ENDPOINT ============
+
+def worker_queue_depths() -> dict:
+    depths = {("analytics_ingest",): analytics_queue.qsize()}
+    motor_executor = getattr(motor_asyncio_framework, "_EXECUTOR", None)
+    if motor_executor is not None:
+        depths[("motor_executor",)] = motor_executor._work_queue.qsize()
+    return depths
+
+CallbackGauge("worker_queue_depth", "Items waiting in in-process work queues", ("queue",), worker_queue_depths)
+CallbackGauge("job_workers", "Configured background job workers", (), lambda: {(): JOB_WORKER_CONCURRENCY})
+CallbackGauge("smtp_connections_available", "Free SMTP pool slots", (),
+              lambda: {(): smtp_pool.semaphore._value} if smtp_pool else {})
+CallbackGauge("notification_stream_subscribers", "Open admin notification streams", (),
+              lambda: {(): sum(len(queues) for queues in notification_broker.subscribers.values())})
+CallbackGauge("token_cache_entries", "Verified tokens cached", (), lambda: {(): len(token_cache)})
+CallbackGauge("product_catalog_version", "Version of this worker's product catalog snapshot", (),
+              lambda: {(): product_catalog.snapshot[0]})
+CallbackGauge("public_response_cache_entries", "Public responses cached with their encodings", (),
+              lambda: {(): len(public_response_cache)})
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus scrape endpoint"""
+    if not METRICS_TOKEN:
+        if not METRICS_PUBLIC:
+            raise HTTPException(status_code=403, detail="Metrics are disabled until METRICS_TOKEN is set")
+    elif not secrets.compare_digest(request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 # Include router and middleware
 app.include_router(api_router)
@@ -1945,12 +4409,132 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+# (collection, keys, options) created at startup for hot query paths
+STARTUP_INDEXES = [
+    ("analytics_events", [("occurred_at", 1)], {}),
+    ("analytics_events", [("day_bucket", 1), ("event_name", 1)], {}),
+    ("analytics_rollups", [("day", 1)], {"unique": True}),
+    ("jobs", [("status", 1), ("run_at", 1)], {}),
+    ("jobs", [("id", 1)], {"unique": True}),
+    ("jobs", [("finished_at", 1)], {"expireAfterSeconds": JOB_RETENTION_DAYS * 86400}),
+    ("notifications", [("recipient_admin_id", 1), ("entity_type", 1), ("entity_id", 1), ("notification_type", 1)],
+     {"unique": True}),
+    ("notifications", [("recipient_admin_id", 1), ("created_at", -1)], {}),
+    ("notifications", [("read_at", 1)], {}),
+    ("notification_counters", [("admin_id", 1)], {"unique": True}),
+    ("notifications_archive", [("id", 1)], {"unique": True}),
+    ("email_logs", [("template_type", 1), ("entity_id", 1), ("to_email", 1)], {"unique": True}),
+    ("email_logs", [("id", 1)], {}),
+    ("email_logs", [("claim_id", 1)], {"sparse": True}),
+    ("rate_limits", [("expires_at", 1)], {"expireAfterSeconds": 0}),
+    ("stream_tickets", [("ticket_hash", 1)], {"unique": True}),
+    ("stream_tickets", [("expires_at", 1)], {"expireAfterSeconds": 0}),
+    ("cart_items", [("user_id", 1), ("product_id", 1)], {"unique": True}),
+    ("rsvps", [("event_id", 1), ("user_id", 1)], {"unique": True}),
+    ("action_participants", [("action_id", 1), ("user_id", 1)], {"unique": True}),
+    ("notify_emails", [("email", 1)], {"unique": True}),
+    ("profiles", [("user_id", 1)], {"unique": True}),
+    ("cart_snapshots", [("user_id", 1)], {"unique": True}),
+    ("cart_snapshots", [("items.product_id", 1)], {}),
+]
+
+# Collections that could hold duplicates written before their unique index
+# existed (check-then-insert races, per-attempt email logs). When the index is
+# missing, each duplicate group is collapsed onto its oldest document before it
+# is built; the listed fields are summed into it so e.g. split cart lines keep
+# their total quantity. Once the index exists, no duplicates can, so later
+# startups skip the scan.
+UNIQUE_INDEX_DEDUPE = {
+    "notifications": [],
+    "email_logs": [],
+    "cart_items": ["quantity"],
+    "rsvps": [],
+    "action_participants": [],
+    "notify_emails": [],
+    "profiles": [],
+}
+background_tasks = []
+
+async def dedupe_for_unique_index(collection: str, keys: list, sum_fields: list) -> int:
+    """Delete all but the oldest document of every duplicate key group; returns documents removed"""
+    group = {"_id": {field: f"${field}" for field, _ in keys}, "ids": {"$push": "$_id"}, "n": {"$sum": 1}}
+    for field in sum_fields:
+        group[field] = {"$sum": f"${field}"}
+    duplicates = await db[collection].aggregate(
+        [{"$sort": {"_id": 1}}, {"$group": group}, {"$match": {"n": {"$gt": 1}}}],
+        allowDiskUse=True
+    ).to_list(None)
+    removed = 0
+    for row in duplicates:
+        keep, extra = row["ids"][0], row["ids"][1:]
+        if sum_fields:
+            await db[collection].update_one({"_id": keep}, {"$set": {field: row[field] for field in sum_fields}})
+        result = await db[collection].delete_many({"_id": {"$in": extra}})
+        removed += result.deleted_count
+    if removed:
+        logger.warning(f"Removed {removed} duplicate documents from {collection} before building its unique index")
+    return removed
+
+@app.on_event("startup")
+async def ensure_indexes():
+    """Create indexes used by hot query paths. Unique indexes back atomic upserts and
+    duplicate-key handling in the routes, so failing to build one aborts startup."""
+    missing_unique = []
+    existing = {}
+    for collection, keys, options in STARTUP_INDEXES:
+        try:
+            if options.get("unique") and collection in UNIQUE_INDEX_DEDUPE:
+                if collection not in existing:
+                    existing[collection] = [
+                        [tuple(key) for key in index["key"]]
+                        for index in (await db[collection].index_information()).values() if index.get("unique")
+                    ]
+                if [tuple(key) for key in keys] not in existing[collection]:
+                    await dedupe_for_unique_index(collection, keys, UNIQUE_INDEX_DEDUPE[collection])
+            await db[collection].create_index(keys, **options)
+        except Exception as e:
+            logger.warning(f"Index creation on {collection} failed: {str(e)}")
+            if options.get("unique"):
+                missing_unique.append(f"{collection} {[field for field, _ in keys]}")
+    if missing_unique:
+        raise RuntimeError(f"Unique indexes missing, refusing to start: {', '.join(missing_unique)}")
+
+@app.on_event("startup")
+async def load_product_catalog():
+    """Warm the product catalog snapshot so the first product views don't hit Mongo"""
+    try:
+        await product_catalog.current()
+    except Exception as e:
+        logger.warning(f"Product catalog load failed, will retry on first read: {str(e)}")
+
+@app.on_event("startup")
+async def start_background_tasks():
+    """Start the analytics writer, job workers, lifecycle jobs, change-stream watchers and loop monitor"""
+    background_tasks.append(asyncio.create_task(run_analytics_flusher()))
+    background_tasks.append(asyncio.create_task(backfill_analytics_enrichment()))
+    background_tasks.append(asyncio.create_task(backfill_post_summaries()))
+    background_tasks.append(asyncio.create_task(run_notification_counter_reconciler()))
+    background_tasks.append(asyncio.create_task(run_notification_compactor()))
+    for worker_id in range(JOB_WORKER_CONCURRENCY):
+        background_tasks.append(asyncio.create_task(job_worker(worker_id)))
+    if ANALYTICS_ARCHIVE_ENABLED and pd is not None:
+        background_tasks.append(asyncio.create_task(run_analytics_archival_loop()))
+    if NOTIFICATIONS_CHANGE_STREAM:
+        background_tasks.append(asyncio.create_task(watch_notification_changes()))
+    if LOOP_MONITOR_ENABLED:
+        background_tasks.append(asyncio.create_task(monitor_event_loop()))
+        threading.Thread(target=watch_loop_heartbeat, args=(loop_watchdog_stop,),
+                         name="loop-watchdog", daemon=True).start()
+    if LOOP_BLOCKING_STRICT:
+        install_blocking_detector()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in background_tasks:
+        task.cancel()
+    loop_watchdog_stop.set()
+    if smtp_pool:
+        await smtp_pool.close()
+    while not analytics_queue.empty():
+        await flush_analytics_queue()
     client.close()
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the backend's hot building blocks.
+
+Each benchmark times one operation on fixed fixtures: a warmup, then --repeat
+timed rounds of enough iterations to fill ~0.2s. Reports the per-operation
+median, min, mean and standard deviation. Results can be stored as a baseline
+and later runs compared against it; a benchmark whose median is slower than
+the baseline by more than --tolerance counts as a regression (exit code 1).
+
+    python backend_benchmark.py run                   # print results
+    python backend_benchmark.py save-baseline         # run and store backend_benchmark_baseline.json
+    python backend_benchmark.py compare --tolerance 0.15
+    python backend_benchmark.py run -k token          # only benchmarks whose name contains "token"
+
+Baselines are machine specific: compare only runs made on the same hardware.
+"""
+
+import argparse
+import asyncio
+import atexit
+import gc
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import List
+
+# server.py reads these at import time; Motor connects lazily so no database is needed
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+os.environ.setdefault("LOOP_MONITOR_ENABLED", "false")
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import server  # noqa: E402
+from PIL import Image  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from starlette.datastructures import Headers, UploadFile  # noqa: E402
+
+BASELINE_PATH = Path(__file__).parent / "backend_benchmark_baseline.json"
+TARGET_ROUND_SECONDS = 0.2
+BENCHMARKS = {}
+
+
+def benchmark(name: str, is_async: bool = False):
+    """Register a fixture factory returning the operation to time"""
+    def register(factory):
+        BENCHMARKS[name] = (factory, is_async)
+        return factory
+    return register
+
+
+# ============ FIXTURES ============
+
+def fixture_posts(count: int) -> list:
+    rng = random.Random(42)
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [{
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "title": f"Post {i}",
+        "content": "Community update. " * 50,
+        "image_url": None,
+        "video_url": None,
+        "author_id": "author",
+        "author_name": "Author",
+        "status": "approved",
+        "rejection_reason": None,
+        "reviewed_by": None,
+        "reviewed_at": None,
+        "created_at": (now - timedelta(hours=i)).isoformat(),
+        "updated_at": (now - timedelta(hours=i)).isoformat(),
+        "comment_count": rng.randint(0, 50),
+    } for i in range(count)]
+
+
+def fixture_analytics(days: int = 90) -> tuple[dict, list]:
+    """$facet output for the live window and one rollup per archived day"""
+    rng = random.Random(7)
+    pages = [f"/posts/{i}" for i in range(500)]
+    facets = {
+        "event_counts": [{"_id": "pageview", "count": 400000}, {"_id": "click", "count": 90000},
+                         {"_id": "page_exit", "count": 200000}],
+        "unique_sessions": [{"count": 120000}],
+        "pages": [{"_id": p, "count": rng.randint(1, 5000)} for p in pages],
+        "clicks": [{"_id": f"button-{i}", "count": rng.randint(1, 900)} for i in range(100)],
+        "referrers": [{"_id": f"site{i}.example", "count": rng.randint(1, 900)} for i in range(300)],
+        "utm_sources": [{"_id": f"campaign-{i}", "count": rng.randint(1, 900)} for i in range(50)],
+        "durations": [{"_id": None, "sum": 5400000, "count": 200000}],
+        "daily": [{"_id": f"2025-01-{d:02d}", "count": rng.randint(1000, 9000)} for d in range(1, 31)],
+    }
+    rollups = [{
+        "day": (datetime(2024, 10, 1) + timedelta(days=d)).strftime("%Y-%m-%d"),
+        "status": "complete",
+        "event_counts": [{"key": "pageview", "count": 5000}, {"key": "click", "count": 900}],
+        "pages": [{"key": p, "count": rng.randint(1, 50)} for p in pages[:200]],
+        "clicks": [{"key": f"button-{i}", "count": rng.randint(1, 20)} for i in range(50)],
+        "referrers": [{"key": f"site{i}.example", "count": rng.randint(1, 20)} for i in range(100)],
+        "utm_sources": [{"key": f"campaign-{i}", "count": rng.randint(1, 20)} for i in range(20)],
+        "unique_sessions": 1500,
+        "duration_sum": 60000,
+        "duration_count": 2000,
+    } for d in range(days)]
+    return facets, rollups
+
+
+def fixture_documents(kind: str, count: int) -> list:
+    """Stored documents for the list routes, shaped like what each route returns"""
+    rng = random.Random(11)
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    docs = []
+    for i in range(count):
+        doc_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        created_at = (now - timedelta(hours=i)).isoformat()
+        if kind == "events":
+            doc = {"id": doc_id, "title": f"Event {i}", "description": "Meet the neighbours. " * 20,
+                   "date": created_at, "location": "Town hall", "image_url": None,
+                   "created_at": created_at, "rsvp_count": rng.randint(0, 300)}
+        elif kind == "actions":
+            doc = {"id": doc_id, "title": f"Action {i}", "description": "Help clean the park. " * 20,
+                   "action_type": "volunteer", "image_url": None, "location": "Park",
+                   "action_url": None, "action_date": created_at, "author_id": "author",
+                   "author_name": "Author", "status": "approved", "created_at": created_at,
+                   "participant_count": rng.randint(0, 300)}
+        elif kind == "users":
+            doc = {"id": doc_id, "email": f"user{i}@example.com", "name": f"User {i}",
+                   "is_admin": False, "created_at": created_at, "token_generation": 0,
+                   "last_login_at": created_at if i % 3 else None, "status": "active"}
+        else:
+            doc = {"id": doc_id, "action": "reset_password", "admin_id": "admin",
+                   "admin_email": "admin@example.com", "target_user_id": "user",
+                   "target_email": "user@example.com", "details": "Reset link generated",
+                   "timestamp": created_at, "outcome": "success"}
+        docs.append(doc)
+    return docs
+
+
+def route_content(path: str, count: int):
+    """(route, handler return value) for one of the big list routes"""
+    route = next(r for r in server.app.routes if getattr(r, "path", None) == path)
+    if path == "/api/posts":
+        return route, {"posts": fixture_posts(count), "total": 5000, "page": 1, "limit": count, "total_pages": 50}
+    return route, fixture_documents(path.rsplit("/", 1)[1].replace("audit-logs", "audit_logs"), count)
+
+
+class FixtureCursor:
+    def __init__(self, docs: list):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class FixtureAnalyticsDb:
+    """Serves fixed aggregation results so only the handler's own work is timed"""
+
+    def __init__(self, facets: dict, rollups: list):
+        self.analytics_events = self
+        self.analytics_rollups = self
+        self.facets = facets
+        self.rollups = rollups
+
+    def aggregate(self, pipeline):
+        return FixtureCursor([self.facets])
+
+    def find(self, query, projection=None):
+        return FixtureCursor(self.rollups)
+
+
+def fixture_image() -> bytes:
+    """A deterministic 2400x1600 JPEG, larger than MAX_IMAGE_DIMENSION so it gets resized"""
+    image = Image.effect_mandelbrot((2400, 1600), (-2.0, -1.2, 1.0, 1.2), 60).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+# ============ BENCHMARKS ============
+
+@benchmark("hash_password")
+def bench_hash_password():
+    return lambda: server.hash_password("Correct-Horse-42!")
+
+
+@benchmark("verify_password")
+def bench_verify_password():
+    hashed = server.hash_password("Correct-Horse-42!")
+    return lambda: server.verify_password("Correct-Horse-42!", hashed)
+
+
+@benchmark("validate_password")
+def bench_validate_password():
+    return lambda: server.validate_password("Correct-Horse-42!")
+
+
+@benchmark("create_token")
+def bench_create_token():
+    return lambda: server.create_token("user-id", "user@example.com", False, 3)
+
+
+@benchmark("decode_token_uncached")
+def bench_decode_token_uncached():
+    token = server.create_token("user-id", "user@example.com", False, 3)
+
+    def decode():
+        server.token_cache.clear()
+        return server.decode_token(token)
+    return decode
+
+
+@benchmark("decode_token_cached")
+def bench_decode_token_cached():
+    token = server.create_token("user-id", "user@example.com", False, 3)
+    server.decode_token(token)
+    return lambda: server.decode_token(token)
+
+
+@benchmark("rate_limiter_hit_100k_keys", is_async=True)
+def bench_rate_limiter_hit():
+    server.rate_limiter = server.InMemoryRateLimitBackend(max_keys=200000)
+    rng = random.Random(3)
+    keys = [f"reset:{rng.getrandbits(48):012x}" for _ in range(100000)]
+    for key in keys:
+        server.rate_limiter.buckets[key] = (3.0, time.monotonic(), time.monotonic() + 3600)
+    picks = iter(rng.choice(keys) for _ in range(10 ** 8))
+    return lambda: server.rate_limiter.hit(next(picks), server.RATE_LIMIT_MAX_REQUESTS, server.RATE_LIMIT_WINDOW)
+
+
+@benchmark("process_and_save_image", is_async=True)
+def bench_process_and_save_image():
+    server.UPLOAD_DIR = Path(tempfile.mkdtemp(prefix="benchmark-uploads-"))
+    atexit.register(shutil.rmtree, server.UPLOAD_DIR, True)
+    content = fixture_image()
+    headers = Headers({"content-type": "image/jpeg"})
+    return lambda: server.process_and_save_image(UploadFile(io.BytesIO(content), headers=headers))
+
+
+@benchmark("get_analytics_90_days", is_async=True)
+def bench_get_analytics():
+    facets, rollups = fixture_analytics()
+    server.db = FixtureAnalyticsDb(facets, rollups)
+    return lambda: server.get_analytics(admin={"id": "admin"}, days=180)
+
+
+@benchmark("serialize_post_response_list_100")
+def bench_serialize_posts():
+    adapter = TypeAdapter(List[server.PostResponse])
+    posts = fixture_posts(100)
+    # What FastAPI does for response_model: validate, dump to JSON-able, then json.dumps
+    return lambda: json.dumps(adapter.dump_python(adapter.validate_python(posts), mode="json"))
+
+
+# Standard path: what FastAPI does with a plain return value (validate against
+# response_model or jsonable_encoder, then json.dumps). Fast path: fast_response
+# with FAST_JSON_RESPONSES on. Both produce the response body bytes.
+LIST_ROUTES = {
+    "posts": ("/api/posts", 100, None),
+    "events": ("/api/events", 100, server.EventResponse),
+    "actions": ("/api/actions", 100, server.ActionResponse),
+    "admin_users": ("/api/admin/users", 1000, None),
+    "audit_logs": ("/api/admin/audit-logs", 500, None),
+}
+
+
+def register_list_route_benchmarks():
+    for label, (path, count, model) in LIST_ROUTES.items():
+        def standard(path=path, count=count):
+            route, content = route_content(path, count)
+
+            async def render():
+                body = await serialize_response(field=route.secure_cloned_response_field, response_content=content)
+                return server.JSONResponse(body).body
+            return render
+
+        def fast(path=path, count=count, model=model):
+            route, content = route_content(path, count)
+            server.FAST_JSON_RESPONSES = True
+
+            async def render():
+                return server.fast_response(content, model).body
+            return render
+
+        benchmark(f"response_{label}_{count}_standard", is_async=True)(standard)
+        benchmark(f"response_{label}_{count}_fast", is_async=True)(fast)
+
+
+register_list_route_benchmarks()
+
+
+# ============ RUNNER ============
+
+def time_rounds(operation, is_async: bool, repeat: int) -> tuple[int, list]:
+    """Return (iterations per round, seconds per operation for each round)"""
+    loop = asyncio.new_event_loop()
+    # Like timeit: keep collector pauses out of the measurement
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+
+    def run_round(number: int) -> float:
+        if is_async:
+            async def rounds():
+                start = time.perf_counter()
+                for _ in range(number):
+                    await operation()
+                return time.perf_counter() - start
+            return loop.run_until_complete(rounds())
+        start = time.perf_counter()
+        for _ in range(number):
+            operation()
+        return time.perf_counter() - start
+
+    try:
+        # Warm up and size the rounds
+        number = 1
+        while True:
+            elapsed = run_round(number)
+            if elapsed >= TARGET_ROUND_SECONDS / 4 or number >= 10 ** 6:
+                break
+            number *= 4
+        number = max(1, int(number * TARGET_ROUND_SECONDS / max(elapsed, 1e-9)))
+        return number, [run_round(number) / number for _ in range(repeat)]
+    finally:
+        loop.close()
+        if gc_was_enabled:
+            gc.enable()
+
+
+def run_benchmarks(pattern: str, repeat: int) -> dict:
+    results = {}
+    server.logger.disabled = True
+    for name, (factory, is_async) in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        number, samples = time_rounds(factory(), is_async, repeat)
+        results[name] = {
+            "iterations": number,
+            "repeat": repeat,
+            "median_us": round(statistics.median(samples) * 1e6, 3),
+            "min_us": round(min(samples) * 1e6, 3),
+            "mean_us": round(statistics.fmean(samples) * 1e6, 3),
+            "stdev_us": round(statistics.stdev(samples) * 1e6, 3) if len(samples) > 1 else 0.0,
+        }
+        print(f"{name:36s} {results[name]['median_us']:>14,.2f} us/op  (±{results[name]['stdev_us']:,.2f})",
+              file=sys.stderr)
+    return results
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent,
+                                         text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> tuple[list, bool]:
+    rows = []
+    regressed = False
+    for name, result in current["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if base is None:
+            rows.append({"benchmark": name, "status": "new", "current_us": result["median_us"]})
+            continue
+        ratio = result["median_us"] / base["median_us"] if base["median_us"] else float("inf")
+        status = "regressed" if ratio > 1 + tolerance else "improved" if ratio < 1 - tolerance else "ok"
+        regressed = regressed or status == "regressed"
+        rows.append({
+            "benchmark": name,
+            "status": status,
+            "baseline_us": base["median_us"],
+            "current_us": result["median_us"],
+            "change_pct": round((ratio - 1) * 100, 1),
+        })
+    return rows, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for backend hot paths")
+    parser.add_argument("command", choices=["run", "save-baseline", "compare"])
+    parser.add_argument("-k", dest="pattern", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--results", help="compare: use a saved results file instead of running")
+    parser.add_argument("--output", help="run: also write results to this file")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="compare: allowed slowdown (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    if args.command == "compare" and args.results:
+        current = json.loads(Path(args.results).read_text())
+    else:
+        current = {"environment": environment(), "benchmarks": run_benchmarks(args.pattern, args.repeat)}
+
+    if args.command == "run":
+        output = json.dumps(current, indent=2, sort_keys=True)
+        if args.output:
+            Path(args.output).write_text(output + "\n")
+        print(output)
+    elif args.command == "save-baseline":
+        Path(args.baseline).write_text(json.dumps(current, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+    else:
+        baseline = json.loads(Path(args.baseline).read_text())
+        rows, regressed = compare(baseline, current, args.tolerance)
+        print(json.dumps({"tolerance": args.tolerance, "regressed": regressed, "results": rows}, indent=2))
+        sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for scale testing.
+
+Fills a database with configurable volumes of every collection the app reads:
+users, posts, comments, products, cart items, events, RSVPs, actions,
+participants, notifications (with matching unread counters), audit logs and
+analytics events. Popularity is skewed the way real traffic is: comments,
+RSVPs, signups and page views follow a Zipfian distribution, so a few posts
+and events get most of the activity.
+
+All ids are drawn up front, so every collection is written concurrently with
+insert_many batches (--parallel batches in flight). Documents have the same
+shape the API writes. Generated users share one password (--password).
+
+    python backend_data_generator.py --mongo-url mongodb://localhost:27017 --db-name scale \
+        --scale 0.1 --drop
+"""
+
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent / "backend"
+DEFAULT_PASSWORD = "Generated#2025!"
+
+DEFAULT_VOLUMES = {
+    "users": 10000,
+    "admins": 3,
+    "posts": 100000,
+    "comments": 1000000,
+    "products": 200,
+    "cart_items": 20000,
+    "events": 1000,
+    "rsvps": 100000,
+    "actions": 1000,
+    "participants": 100000,
+    "notifications": 50000,
+    "audit_logs": 20000,
+    "analytics_events": 5000000,
+}
+
+GENERATED_COLLECTIONS = [
+    "users", "posts", "comments", "products", "cart_items", "events", "rsvps", "actions",
+    "action_participants", "notifications", "notification_counters", "audit_logs", "analytics_events",
+]
+
+PAGES = ["/", "/posts", "/events", "/actions", "/shop", "/about"]
+REFERRERS = [None, None, "https://www.google.com/", "https://t.co/abc", "https://www.instagram.com/",
+             "https://news.ycombinator.com/"]
+UTM_SOURCES = [None, None, None, "newsletter", "instagram", "twitter"]
+AUDIT_ACTIONS = ["password_reset_request", "user_update", "data_export", "revoke_sessions", "profile"]
+
+
+def zipf_picker(items: list, rng: random.Random, exponent: float = 1.1):
+    """Return a function that picks items with Zipfian popularity (first item most popular)"""
+    cumulative = list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, len(items) + 1)))
+    total = cumulative[-1]
+    return lambda: items[bisect.bisect_left(cumulative, rng.random() * total)]
+
+
+def unique_pairs(count: int, pick_left, pick_right, max_pairs: int) -> list:
+    """Draw up to `count` distinct (left, right) pairs, e.g. one RSVP per user per event"""
+    count = min(count, max_pairs)
+    pairs = set()
+    attempts = 0
+    while len(pairs) < count and attempts < count * 20:
+        pairs.add((pick_left(), pick_right()))
+        attempts += 1
+    return list(pairs)
+
+
+class DatasetGenerator:
+    """Builds documents for each collection from pre-drawn ids"""
+
+    def __init__(self, server, volumes: dict, seed: int, password: str):
+        self.server = server
+        self.volumes = volumes
+        self.rng = random.Random(seed)
+        self.now = datetime.now(timezone.utc)
+        self.password_hash = server.hash_password(password)
+
+        rng = self.rng
+        self.users = [{
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "email": f"user{i}@example.com",
+            "name": f"Generated User {i}",
+            "is_admin": i < volumes["admins"],
+        } for i in range(volumes["users"])]
+        self.admins = [u for u in self.users if u["is_admin"]] or self.users[:1]
+        self.post_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(volumes["posts"])]
+        self.post_status = [self.pick_status() for _ in self.post_ids]
+        self.approved_post_ids = [p for p, s in zip(self.post_ids, self.post_status) if s == "approved"]
+        self.product_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(volumes["products"])]
+        self.event_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(volumes["events"])]
+        self.action_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(volumes["actions"])]
+        self.action_status = [self.pick_status() for _ in self.action_ids]
+        self.approved_action_ids = [a for a, s in zip(self.action_ids, self.action_status) if s == "approved"]
+
+    def pick_status(self) -> str:
+        roll = self.rng.random()
+        return "approved" if roll < 0.85 else "pending" if roll < 0.95 else "rejected"
+
+    def past(self, max_days: int) -> datetime:
+        return self.now - timedelta(seconds=self.rng.randint(0, max_days * 86400))
+
+    def new_id(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128)))
+
+    # ---- document factories: (count, make_doc(i)) per collection ----
+
+    def users_docs(self):
+        def make(i):
+            user = self.users[i]
+            return {**user, "password_hash": self.password_hash, "created_at": self.past(730).isoformat()}
+        return len(self.users), make
+
+    def posts_docs(self):
+        def make(i):
+            author = self.rng.choice(self.users)
+            created_at = self.past(365).isoformat()
+            status = self.post_status[i]
+            content = "Neighbourhood news and updates. " * self.rng.randint(10, 300)
+            return {
+                "id": self.post_ids[i],
+                "title": f"Post {i}: community update",
+                "content": content,
+                **self.server.post_summary(content),
+                "image_url": None,
+                "video_url": None,
+                "author_id": author["id"],
+                "author_name": author["name"],
+                "status": status,
+                "rejection_reason": "Off topic" if status == "rejected" else None,
+                "reviewed_by": self.admins[0]["id"] if status != "pending" else None,
+                "reviewed_at": created_at if status != "pending" else None,
+                "created_at": created_at,
+                "updated_at": created_at,
+            }
+        return len(self.post_ids), make
+
+    def comments_docs(self):
+        if not self.approved_post_ids:
+            return 0, None
+        pick_post = zipf_picker(self.approved_post_ids, self.rng)
+
+        def make(i):
+            author = self.rng.choice(self.users)
+            return {
+                "id": self.new_id(),
+                "post_id": pick_post(),
+                "author_id": author["id"],
+                "author_name": author["name"],
+                "body": self.rng.choice(["Great to see this!", "Count me in.", "Thanks for sharing",
+                                         "When is the next one?"]),
+                "status": "approved",
+                "created_at": self.past(365).isoformat(),
+            }
+        return self.volumes["comments"], make
+
+    def products_docs(self):
+        def make(i):
+            return {
+                "id": self.product_ids[i],
+                "title": f"Product {i}",
+                "description": "Campaign merchandise.",
+                "price": round(self.rng.uniform(5, 80), 2),
+                "image_url": None,
+                "available": self.rng.random() < 0.9,
+                "created_at": self.past(365).isoformat(),
+            }
+        return len(self.product_ids), make
+
+    def cart_items_docs(self):
+        pairs = unique_pairs(self.volumes["cart_items"], lambda: self.rng.choice(self.users)["id"],
+                             zipf_picker(self.product_ids, self.rng), len(self.users) * len(self.product_ids))
+
+        def make(i):
+            user_id, product_id = pairs[i]
+            return {"id": self.new_id(), "user_id": user_id, "product_id": product_id,
+                    "quantity": min(10, int(self.rng.expovariate(0.7)) + 1)}
+        return len(pairs), make
+
+    def events_docs(self):
+        def make(i):
+            return {
+                "id": self.event_ids[i],
+                "title": f"Event {i}",
+                "description": "Join us in the neighbourhood.",
+                "date": (self.now + timedelta(days=self.rng.randint(-180, 90))).isoformat(),
+                "location": self.rng.choice(["Brooklyn, NY", "Queens, NY", "Online"]),
+                "image_url": None,
+                "created_at": self.past(365).isoformat(),
+            }
+        return len(self.event_ids), make
+
+    def rsvps_docs(self):
+        return self.membership_docs(self.volumes["rsvps"], self.event_ids, "event_id", with_message=False)
+
+    def actions_docs(self):
+        def make(i):
+            author = self.rng.choice(self.users)
+            created_at = self.past(365).isoformat()
+            status = self.action_status[i]
+            return {
+                "id": self.action_ids[i],
+                "title": f"Action {i}",
+                "description": "Help out with this campaign.",
+                "action_type": self.rng.choice(["volunteer", "petition", "pledge"]),
+                "image_url": None,
+                "location": None,
+                "action_url": None,
+                "action_date": None,
+                "author_id": author["id"],
+                "author_name": author["name"],
+                "status": status,
+                "rejection_reason": "Duplicate" if status == "rejected" else None,
+                "reviewed_by": self.admins[0]["id"] if status != "pending" else None,
+                "reviewed_at": created_at if status != "pending" else None,
+                "created_at": created_at,
+            }
+        return len(self.action_ids), make
+
+    def action_participants_docs(self):
+        return self.membership_docs(self.volumes["participants"], self.approved_action_ids, "action_id",
+                                    with_message=True)
+
+    def membership_docs(self, count: int, targets: list, target_field: str, with_message: bool):
+        """RSVPs and action signups: distinct (target, user) pairs, popular targets first"""
+        if not targets:
+            return 0, None
+        pairs = unique_pairs(count, zipf_picker(targets, self.rng), lambda: self.rng.randrange(len(self.users)),
+                             len(targets) * len(self.users))
+
+        def make(i):
+            target_id, user_index = pairs[i]
+            user = self.users[user_index]
+            doc = {
+                "id": self.new_id(),
+                target_field: target_id,
+                "user_id": user["id"],
+                "user_name": user["name"],
+                "user_email": user["email"],
+                "created_at": self.past(180).isoformat(),
+            }
+            if with_message:
+                doc["message"] = None
+            return doc
+        return len(pairs), make
+
+    def notifications_docs(self):
+        # One notification per admin per pending submission, like create_admin_notifications
+        pending = [("post", p) for p, s in zip(self.post_ids, self.post_status) if s == "pending"]
+        pending += [("action", a) for a, s in zip(self.action_ids, self.action_status) if s == "pending"]
+        targets = [(admin, entity) for entity in pending for admin in self.admins][:self.volumes["notifications"]]
+        self.unread_counts = defaultdict(int)
+
+        def make(i):
+            admin, (entity_type, entity_id) = targets[i]
+            created_at = self.past(60)
+            read = self.rng.random() < 0.7
+            if not read:
+                self.unread_counts[admin["id"]] += 1
+            return {
+                "id": self.new_id(),
+                "recipient_admin_id": admin["id"],
+                "notification_type": f"new_{entity_type}",
+                "entity_type": entity_type,
+                "entity_id": entity_id,
+                "message": f"New {entity_type} submitted awaiting review",
+                "created_at": created_at.isoformat(),
+                "read_at": (created_at + timedelta(hours=2)).isoformat() if read else None,
+            }
+        return len(targets), make
+
+    def audit_logs_docs(self):
+        def make(i):
+            admin = self.rng.choice(self.admins)
+            target = self.rng.choice(self.users)
+            return {
+                "id": self.new_id(),
+                "action": self.rng.choice(AUDIT_ACTIONS),
+                "admin_id": admin["id"],
+                "admin_email": admin["email"],
+                "target_user_id": target["id"],
+                "target_email": target["email"],
+                "details": "Generated entry",
+                "timestamp": self.past(365).isoformat(),
+                "outcome": "success" if self.rng.random() < 0.97 else "blocked",
+            }
+        return self.volumes["audit_logs"], make
+
+    def analytics_events_docs(self):
+        pages = PAGES + [f"/posts/{post_id}" for post_id in self.approved_post_ids[:500]]
+        pick_page = zipf_picker(pages, self.rng)
+        sessions = max(1, self.volumes["analytics_events"] // 6)
+
+        def make(i):
+            occurred = self.now - timedelta(seconds=self.rng.randint(0, 90 * 86400))
+            page = pick_page()
+            referrer = self.rng.choice(REFERRERS)
+            roll = self.rng.random()
+            if roll < 0.7:
+                event_name, metadata = "pageview", {}
+            elif roll < 0.85:
+                event_name, metadata = "click", {"button_id": f"cta-{self.rng.randint(1, 40)}"}
+            else:
+                event_name, metadata = "page_exit", {"duration_seconds": round(self.rng.expovariate(1 / 45), 1)}
+            doc = {
+                "id": self.new_id(),
+                "event_name": event_name,
+                "page_path": page,
+                "referrer": referrer,
+                "session_id": f"session-{self.rng.randrange(sessions)}",
+                "timestamp": occurred.isoformat(),
+                "utm_source": self.rng.choice(UTM_SOURCES),
+                "utm_medium": None,
+                "utm_campaign": None,
+                "metadata": metadata,
+                "is_bot": self.rng.random() < 0.02,
+                "weight": 1,
+                "created_at": occurred.isoformat(),
+            }
+            doc.update(self.server.enrich_analytics_fields(page, referrer, doc["timestamp"], occurred))
+            return doc
+        return self.volumes["analytics_events"], make
+
+
+async def insert_collection(collection, count: int, make_doc, batch_size: int, semaphore: asyncio.Semaphore) -> int:
+    """Write `count` generated docs with insert_many; batches share the global semaphore"""
+    async def insert(start: int):
+        async with semaphore:
+            docs = [make_doc(i) for i in range(start, min(start + batch_size, count))]
+            await collection.insert_many(docs, ordered=False)
+
+    await asyncio.gather(*(insert(start) for start in range(0, count, batch_size)))
+    return count
+
+
+async def generate_dataset(server, volumes: dict, batch_size: int = 5000, parallel: int = 8,
+                           seed: int = 1, password: str = DEFAULT_PASSWORD, drop: bool = False) -> tuple:
+    """Generate every collection into server.db. Returns (generator, {collection: count})."""
+    db = server.db
+    if drop:
+        for name in GENERATED_COLLECTIONS:
+            await db[name].drop()
+
+    generator = DatasetGenerator(server, volumes, seed, password)
+    semaphore = asyncio.Semaphore(parallel)
+    factories = {
+        "users": generator.users_docs, "posts": generator.posts_docs, "comments": generator.comments_docs,
+        "products": generator.products_docs, "cart_items": generator.cart_items_docs,
+        "events": generator.events_docs, "rsvps": generator.rsvps_docs, "actions": generator.actions_docs,
+        "action_participants": generator.action_participants_docs,
+        "notifications": generator.notifications_docs, "audit_logs": generator.audit_logs_docs,
+        "analytics_events": generator.analytics_events_docs,
+    }
+    plans = {name: factory() for name, factory in factories.items()}
+    written = await asyncio.gather(*(
+        insert_collection(db[name], count, make_doc, batch_size, semaphore)
+        for name, (count, make_doc) in plans.items() if count
+    ))
+    counts = dict(zip([name for name, (count, _) in plans.items() if count], written))
+
+    # Keep unread counters consistent with the notifications just written
+    for admin_id, unread in generator.unread_counts.items():
+        await db.notification_counters.update_one({"admin_id": admin_id}, {"$inc": {"unread": unread}}, upsert=True)
+    # Running workers only reload their product catalog when its version moves
+    await server.product_catalog.publish()
+    return generator, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic data for scale testing")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default=os.environ.get("DB_NAME"), required="DB_NAME" not in os.environ)
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every volume by this factor")
+    for name, default in DEFAULT_VOLUMES.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=int, default=default)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--parallel", type=int, default=8, help="insert_many batches in flight")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help="Password for every generated user")
+    parser.add_argument("--drop", action="store_true", help="Drop the generated collections first")
+    args = parser.parse_args()
+
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db_name
+    sys.path.insert(0, str(BACKEND_DIR))
+    import server
+
+    volumes = {name: max(1, int(getattr(args, name) * args.scale)) for name in DEFAULT_VOLUMES}
+    volumes["admins"] = args.admins
+    start = time.perf_counter()
+    _, counts = asyncio.run(generate_dataset(server, volumes, args.batch_size, args.parallel, args.seed,
+                                             args.password, args.drop))
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "database": args.db_name,
+        "counts": counts,
+        "seconds": round(elapsed, 1),
+        "docs_per_second": round(sum(counts.values()) / elapsed),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
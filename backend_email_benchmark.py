@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Email outbox throughput benchmark.
+
+Starts a local aiosmtpd server as an SMTP stand-in and pushes messages through
+the backend's SMTPConnectionPool exactly the way the deliver_emails job does
+(template rendered once per batch, per-recipient headers, retries with jitter).
+Prints messages per second as JSON so runs can be compared.
+
+    python backend_email_benchmark.py --messages 2000 --connections 4
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+from aiosmtpd.controller import Controller
+
+# server.py reads these at import time; Motor connects lazily so no database is needed
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "email_benchmark")
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+import server  # noqa: E402
+
+logging.getLogger("mail.log").setLevel(logging.WARNING)
+
+
+class CountingHandler:
+    """Accept every message and count deliveries"""
+
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, smtp_server, session, envelope):
+        self.received += 1
+        return "250 Message accepted for delivery"
+
+
+async def run_benchmark(messages: int, connections: int, port: int) -> dict:
+    handler = CountingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    pool = server.SMTPConnectionPool("127.0.0.1", port, max_connections=connections)
+    try:
+        context = {"entity_type": "post", "entity_title": "Benchmark post", "author_name": "Load Tester"}
+        start = time.perf_counter()
+        rendered = server.render_email_template("pending_content_notification", context)
+        results = await asyncio.gather(*(
+            server.send_with_retries(pool, server.SMTP_FROM, f"admin{i}@example.com", rendered)
+            for i in range(messages)
+        ))
+        elapsed = time.perf_counter() - start
+    finally:
+        await pool.close()
+        controller.stop()
+
+    sent = sum(1 for status, _, _ in results if status == "sent")
+    return {
+        "messages": messages,
+        "connections": connections,
+        "sent": sent,
+        "failed": messages - sent,
+        "received_by_server": handler.received,
+        "seconds": round(elapsed, 3),
+        "messages_per_second": round(sent / elapsed, 1) if elapsed else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark email outbox delivery throughput")
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--connections", type=int, default=server.SMTP_MAX_CONNECTIONS)
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+
+    result = asyncio.run(run_benchmark(args.messages, args.connections, args.port))
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["failed"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Offline load test for the backend.
+
+Starts the API locally in a child process, seeds it with a realistic volume of
+data (see backend_data_generator.py), drives a weighted mix of concurrent read and write requests for a fixed
+duration and reports latency percentiles and throughput per endpoint as JSON
+(sorted keys, so two runs can be diffed).
+
+The child process talks to a local mongod (--mongo-url) or, with --in-memory,
+to mongomock-motor (pinned in backend/requirements.txt). The in-memory stand-in is
+only practical for small volumes; use --scale to shrink the defaults.
+
+    # Full volumes against a local mongod
+    python backend_load_test.py --mongo-url mongodb://localhost:27017 --output load.json
+
+    # Quick run without MongoDB
+    python backend_load_test.py --in-memory --scale 0.01 --duration 20
+"""
+
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from backend_data_generator import BACKEND_DIR, DEFAULT_VOLUMES, generate_dataset, zipf_picker
+
+LOAD_TEST_PASSWORD = "LoadTest#2025!"
+
+
+def serve(args):
+    """Child process: import the app, seed it, write fixtures and serve"""
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db_name
+    os.environ.setdefault("LOG_SUCCESS_SAMPLE_RATE", "0")
+    sys.path.insert(0, str(BACKEND_DIR))
+    import server
+    import uvicorn
+
+    if args.in_memory:
+        import mongomock_motor
+        server.client = mongomock_motor.AsyncMongoMockClient()
+        server.db = server.client[args.db_name]
+
+    async def seed_on_startup():
+        start = time.perf_counter()
+        generator, counts = await generate_dataset(server, json.loads(args.volumes), args.batch_size,
+                                                   args.parallel, password=LOAD_TEST_PASSWORD)
+        users = [u for u in generator.users if not u["is_admin"]][:500] or generator.users[:1]
+        admin = generator.admins[0]
+        fixtures = {
+            "admin_token": server.create_token(admin["id"], admin["email"], True),
+            "user_tokens": [server.create_token(u["id"], u["email"], False) for u in users],
+            "user_emails": [u["email"] for u in users],
+            "post_ids": generator.approved_post_ids[:5000],
+            "event_ids": generator.event_ids[:500],
+            "seed_counts": counts,
+            "seed_seconds": round(time.perf_counter() - start, 1),
+        }
+        Path(args.fixtures).write_text(json.dumps(fixtures))
+
+    server.app.add_event_handler("startup", seed_on_startup)
+    uvicorn.run(server.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+# ============ LOAD GENERATION ============
+
+def build_scenarios(fixtures: dict) -> list:
+    """(label, weight, request factory) for the mixed workload"""
+    admin = {"Authorization": f"Bearer {fixtures['admin_token']}"}
+    pick_post = zipf_picker(fixtures["post_ids"], random.Random())
+    user_index = itertools.count()
+
+    def user_headers():
+        return {"Authorization": f"Bearer {random.choice(fixtures['user_tokens'])}"}
+
+    def analytics_event():
+        return {
+            "event_name": "page_view",
+            "page_path": random.choice(["/", "/posts", "/events"]),
+            "session_id": uuid.uuid4().hex,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+
+    def comment():
+        # Round-robin users so the per-user comment rate limit is rarely hit
+        token = fixtures["user_tokens"][next(user_index) % len(fixtures["user_tokens"])]
+        return ("POST", f"/api/posts/{pick_post()}/comments",
+                {"json": {"body": "Load test comment"}, "headers": {"Authorization": f"Bearer {token}"}})
+
+    return [
+        ("GET /api/posts", 20, lambda: ("GET", "/api/posts", {"params": {"page": random.randint(1, 50)}})),
+        ("GET /api/posts/latest", 15, lambda: ("GET", "/api/posts/latest", {})),
+        ("GET /api/posts/{post_id}", 15, lambda: ("GET", f"/api/posts/{pick_post()}", {})),
+        ("GET /api/posts/{post_id}/comments", 10, lambda: ("GET", f"/api/posts/{pick_post()}/comments", {})),
+        ("GET /api/events", 8, lambda: ("GET", "/api/events", {})),
+        ("GET /api/actions", 8, lambda: ("GET", "/api/actions", {})),
+        ("GET /api/auth/me", 6, lambda: ("GET", "/api/auth/me", {"headers": user_headers()})),
+        ("POST /api/analytics/event", 10, lambda: ("POST", "/api/analytics/event", {"json": analytics_event()})),
+        ("POST /api/posts/{post_id}/comments", 4, comment),
+        ("POST /api/events/{event_id}/rsvp", 2, lambda: (
+            "POST", f"/api/events/{random.choice(fixtures['event_ids'])}/rsvp", {"headers": user_headers()})),
+        ("POST /api/auth/login", 1, lambda: ("POST", "/api/auth/login", {
+            "json": {"email": random.choice(fixtures["user_emails"]), "password": LOAD_TEST_PASSWORD}})),
+        ("GET /api/admin/analytics", 1, lambda: ("GET", "/api/admin/analytics", {"headers": admin})),
+    ]
+
+
+async def drive_load(base_url: str, fixtures: dict, concurrency: int, duration: float, warmup: float) -> dict:
+    scenarios = build_scenarios(fixtures)
+    labels = [label for label, _, _ in scenarios]
+    weights = list(itertools.accumulate(weight for _, weight, _ in scenarios))
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+
+    async def worker(client: httpx.AsyncClient):
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                return
+            index = bisect.bisect_left(weights, random.random() * weights[-1])
+            method, url, kwargs = scenarios[index][2]()
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            if start >= measure_from:
+                latencies[labels[index]].append(elapsed)
+                statuses[labels[index]][status] += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+
+    return {label: summarize(latencies[label], statuses[label], duration) for label in labels if latencies[label]}
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def summarize(values: list, status_counts: dict, duration: float) -> dict:
+    values = sorted(values)
+    errors = sum(count for status, count in status_counts.items() if not status.isdigit() or int(status) >= 500)
+    return {
+        "requests": len(values),
+        "throughput_rps": round(len(values) / duration, 2),
+        "errors": errors,
+        "status_counts": dict(sorted(status_counts.items())),
+        "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+        "mean_ms": round(sum(values) / len(values) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent,
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def wait_for_server(base_url: str, fixtures_path: Path, child: subprocess.Popen, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if child.poll() is not None:
+            raise RuntimeError(f"Server exited during startup with code {child.returncode}")
+        if fixtures_path.exists() and fixtures_path.stat().st_size:
+            try:
+                if httpx.get(f"{base_url}/api/health", timeout=5).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+        time.sleep(1)
+    raise TimeoutError("Server did not become ready (seeding may need a longer --startup-timeout)")
+
+
+def run(args):
+    volumes = {name: max(1, int(getattr(args, name) * args.scale)) for name in DEFAULT_VOLUMES}
+    volumes["users"] = max(volumes["users"], 2)
+    volumes["admins"] = 1
+    port = args.port or free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    db_name = args.db_name or f"loadtest_{uuid.uuid4().hex[:8]}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures_path = Path(tmp) / "fixtures.json"
+        command = [sys.executable, __file__, "serve", "--port", str(port), "--mongo-url", args.mongo_url,
+                   "--db-name", db_name, "--fixtures", str(fixtures_path), "--volumes", json.dumps(volumes),
+                   "--batch-size", str(args.batch_size), "--parallel", str(args.parallel)]
+        if args.in_memory:
+            command.append("--in-memory")
+        child = subprocess.Popen(command, cwd=BACKEND_DIR)
+        try:
+            wait_for_server(base_url, fixtures_path, child, args.startup_timeout)
+            fixtures = json.loads(fixtures_path.read_text())
+            endpoints = asyncio.run(drive_load(base_url, fixtures, args.concurrency, args.duration, args.warmup))
+        finally:
+            child.terminate()
+            child.wait(timeout=30)
+
+    total = sum(e["requests"] for e in endpoints.values())
+    result = {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "backend": "mongomock" if args.in_memory else "mongod",
+            "volumes": volumes,
+            "seed_counts": fixtures.get("seed_counts"),
+            "seed_seconds": fixtures.get("seed_seconds"),
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+        },
+        "overall": {
+            "requests": total,
+            "throughput_rps": round(total / args.duration, 2),
+            "errors": sum(e["errors"] for e in endpoints.values()),
+        },
+        "endpoints": endpoints,
+    }
+    output = json.dumps(result, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+    sys.exit(0 if result["overall"]["errors"] == 0 else 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seeded offline load test for the backend API")
+    parser.add_argument("mode", nargs="?", default="run", choices=["run", "serve"], help=argparse.SUPPRESS)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", help="Database to seed (default: a fresh loadtest_* name)")
+    parser.add_argument("--in-memory", action="store_true", help="Use mongomock-motor instead of mongod")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every volume by this factor")
+    for name, default in DEFAULT_VOLUMES.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=int, default=default)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--parallel", type=int, default=8, help="insert_many batches in flight while seeding")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--startup-timeout", type=float, default=3600)
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    # Internal: used by the serve child process
+    parser.add_argument("--fixtures", help=argparse.SUPPRESS)
+    parser.add_argument("--volumes", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode == "serve":
+        serve(args)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Login throttling load test.
+
+Fires credential-stuffing style traffic (wrong passwords against one or more
+accounts, optionally spread over spoofed client IPs) at /api/auth/login and
+reports status codes, throughput and, when --server-pid is given, how much CPU
+the backend process burned. With throttling on, almost every attempt should be
+a 429 that never reaches bcrypt, so server CPU stays flat as --requests grows.
+--ips only spreads traffic when the backend runs with TRUST_FORWARDED_FOR=true.
+
+    python backend_login_load_test.py --base-url http://localhost:8001 \
+        --email victim@example.com --requests 2000 --server-pid $(pgrep -f uvicorn)
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def process_cpu_seconds(pid: int) -> float:
+    """User + system CPU time of a local process, from /proc"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def attempt(session: requests.Session, url: str, email: str, ip: str, i: int) -> int:
+    response = session.post(
+        url,
+        json={"email": email, "password": f"wrong-password-{i}"},
+        headers={"X-Forwarded-For": ip},
+        timeout=30,
+    )
+    return response.status_code
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test login throttling")
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--email", action="append", help="Target account (repeatable)")
+    parser.add_argument("--ips", type=int, default=1, help="Number of distinct X-Forwarded-For addresses (needs TRUST_FORWARDED_FOR=true)")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--server-pid", type=int, help="Backend pid to measure CPU for")
+    args = parser.parse_args()
+
+    emails = args.email or ["loadtest@example.com"]
+    url = f"{args.base_url}/api/auth/login"
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    cpu_before = process_cpu_seconds(args.server_pid) if args.server_pid else None
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        statuses = list(pool.map(
+            lambda i: attempt(session, url, emails[i % len(emails)], f"10.0.{i % args.ips // 256}.{i % args.ips % 256}", i),
+            range(args.requests),
+        ))
+    elapsed = time.perf_counter() - start
+
+    counts = Counter(statuses)
+    result = {
+        "requests": args.requests,
+        "emails": len(emails),
+        "ips": args.ips,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(args.requests / elapsed, 1),
+        "status_counts": {str(code): n for code, n in sorted(counts.items())},
+        # Every non-429 response went through a password check (or an unknown-email miss)
+        "password_checks": args.requests - counts.get(429, 0),
+    }
+    if cpu_before is not None:
+        cpu = process_cpu_seconds(args.server_pid) - cpu_before
+        result["server_cpu_seconds"] = round(cpu, 3)
+        result["server_cpu_ms_per_request"] = round(cpu * 1000 / args.requests, 3)
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if counts.get(500, 0) == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
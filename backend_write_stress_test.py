@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Concurrent write stress test.
+
+Simulates double-clicks and client retries: every user fires --burst identical
+requests at once at RSVP, action signup, add-to-cart, notify-me and profile
+update. Afterwards the stored data is checked: exactly one RSVP, signup, cart
+line, subscription and profile per user, and a cart quantity equal to the sum
+of all adds. Reports latency percentiles and status codes per endpoint as JSON,
+plus every invariant that failed (exit code 1).
+
+Requests go straight to the ASGI app in-process, against a fresh database on a
+local mongod (--mongo-url, dropped afterwards) or mongomock-motor (--in-memory).
+Only a real mongod exercises true concurrency on the server side.
+
+    python backend_write_stress_test.py --mongo-url mongodb://localhost:27017
+    python backend_write_stress_test.py --in-memory --users 50 --burst 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+from backend_data_generator import BACKEND_DIR
+from backend_load_test import summarize
+
+
+async def create_fixtures(server, user_count: int) -> dict:
+    """Users with tokens, plus one event, action and product to write against"""
+    now = datetime.now(timezone.utc).isoformat()
+    password_hash = server.hash_password("StressTest#2025!")
+    users = [{
+        "id": str(uuid.uuid4()),
+        "email": f"stress{i}@example.com",
+        "name": f"Stress {i}",
+        "is_admin": False,
+        "password_hash": password_hash,
+        "created_at": now,
+    } for i in range(user_count)]
+    await server.db.users.insert_many([dict(u) for u in users])
+
+    event_id, action_id, product_id = (str(uuid.uuid4()) for _ in range(3))
+    await server.db.events.insert_one({"id": event_id, "title": "Stress event", "description": "d",
+                                       "date": now, "location": "Hall", "created_at": now})
+    await server.db.actions.insert_one({"id": action_id, "title": "Stress action", "description": "d",
+                                        "action_type": "volunteer", "status": "approved", "created_at": now})
+    await server.db.products.insert_one({"id": product_id, "title": "Stress product", "description": "d",
+                                         "price": 10.0, "available": True, "created_at": now})
+    await server.product_catalog.publish()
+    return {
+        "users": [(u, server.create_token(u["id"], u["email"], False)) for u in users],
+        "event_id": event_id,
+        "action_id": action_id,
+        "product_id": product_id,
+    }
+
+
+def build_scenarios(fixtures: dict) -> list:
+    """(label, expected status counts per burst, request factory(user))"""
+    return [
+        ("POST /api/events/{event_id}/rsvp", {"200": 1, "400": None},
+         lambda u: ("POST", f"/api/events/{fixtures['event_id']}/rsvp", {})),
+        ("POST /api/actions/{action_id}/signup", {"200": 1, "400": None},
+         lambda u: ("POST", f"/api/actions/{fixtures['action_id']}/signup", {"json": {"message": "Count me in"}})),
+        ("POST /api/cart/add", {"200": None},
+         lambda u: ("POST", "/api/cart/add", {"json": {"product_id": fixtures["product_id"], "quantity": 1}})),
+        ("POST /api/notify", {"200": None},
+         lambda u: ("POST", "/api/notify", {"json": {"email": u["email"]}})),
+        ("PUT /api/profile", {"200": None},
+         lambda u: ("PUT", "/api/profile", {"json": {"bio": f"Bio of {u['name']}"}})),
+    ]
+
+
+async def fire(client: httpx.AsyncClient, label: str, factory, fixtures: dict, burst: int) -> tuple:
+    """Send `burst` identical requests per user, all at once; return (summary, per-user status counts)"""
+    latencies = []
+    statuses = defaultdict(int)
+    per_user = defaultdict(lambda: defaultdict(int))
+
+    async def one(user: dict, token: str):
+        method, url, kwargs = factory(user)
+        start = time.perf_counter()
+        response = await client.request(method, url, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+        latencies.append(time.perf_counter() - start)
+        statuses[str(response.status_code)] += 1
+        per_user[user["id"]][str(response.status_code)] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(user, token) for user, token in fixtures["users"] for _ in range(burst)))
+    return summarize(latencies, statuses, time.perf_counter() - start), per_user
+
+
+async def duplicate_keys(collection, fields: list) -> int:
+    """Number of key combinations stored more than once"""
+    group = {"_id": {f: f"${f}" for f in fields}, "n": {"$sum": 1}}
+    rows = await collection.aggregate([{"$group": group}, {"$match": {"n": {"$gt": 1}}}]).to_list(None)
+    return len(rows)
+
+
+async def check_invariants(server, fixtures: dict, burst: int, per_user_statuses: dict) -> list:
+    db = server.db
+    user_count = len(fixtures["users"])
+    failures = []
+
+    for label, expected in per_user_statuses.items():
+        expected_counts, per_user = expected
+        for user_id, counts in per_user.items():
+            for status, count in counts.items():
+                if status not in expected_counts:
+                    failures.append(f"{label}: unexpected status {status} for user {user_id}")
+            for status, count in expected_counts.items():
+                if count is not None and counts.get(status, 0) != count:
+                    failures.append(f"{label}: user {user_id} got {counts.get(status, 0)}x {status}, expected {count}")
+
+    stored = {
+        "rsvps": (db.rsvps, ["event_id", "user_id"]),
+        "action_participants": (db.action_participants, ["action_id", "user_id"]),
+        "cart_items": (db.cart_items, ["user_id", "product_id"]),
+        "notify_emails": (db.notify_emails, ["email"]),
+        "profiles": (db.profiles, ["user_id"]),
+    }
+    for name, (collection, fields) in stored.items():
+        duplicates = await duplicate_keys(collection, fields)
+        if duplicates:
+            failures.append(f"{name}: {duplicates} keys stored more than once")
+        total = await collection.count_documents({})
+        if total != user_count:
+            failures.append(f"{name}: {total} documents, expected {user_count}")
+
+    wrong_quantity = await db.cart_items.count_documents({"quantity": {"$ne": burst}})
+    if wrong_quantity:
+        failures.append(f"cart_items: {wrong_quantity} lines lost concurrent adds (quantity != {burst})")
+    return failures
+
+
+async def run(args) -> dict:
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = f"stresstest_{uuid.uuid4().hex[:8]}"
+    os.environ.setdefault("LOG_SUCCESS_SAMPLE_RATE", "0")
+    sys.path.insert(0, str(BACKEND_DIR))
+    import server
+
+    if args.in_memory:
+        import mongomock_motor
+        server.client = mongomock_motor.AsyncMongoMockClient()
+        server.db = server.client[os.environ["DB_NAME"]]
+
+    try:
+        await server.ensure_indexes()
+        fixtures = await create_fixtures(server, args.users)
+        endpoints = {}
+        per_user_statuses = {}
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://stress.test", timeout=60) as client:
+            for label, expected, factory in build_scenarios(fixtures):
+                endpoints[label], per_user = await fire(client, label, factory, fixtures, args.burst)
+                per_user_statuses[label] = (expected, per_user)
+        failures = await check_invariants(server, fixtures, args.burst, per_user_statuses)
+    finally:
+        if not args.in_memory:
+            await server.client.drop_database(os.environ["DB_NAME"])
+
+    return {
+        "meta": {
+            "backend": "mongomock" if args.in_memory else "mongod",
+            "users": args.users,
+            "burst": args.burst,
+        },
+        "endpoints": endpoints,
+        "failures": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent duplicate-write stress test for the backend API")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--in-memory", action="store_true", help="Use mongomock-motor instead of mongod")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--burst", type=int, default=5, help="Identical concurrent requests per user")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    output = json.dumps(result, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    sys.exit(1 if result["failures"] else 0)
+
+
+if __name__ == "__main__":
+    main()
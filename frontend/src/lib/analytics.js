@@ -24,11 +24,39 @@ const getUtmParams = () => {
   };
 };
 
+// Server-controlled sample rates, refreshed periodically
+const CONFIG_REFRESH_MS = 5 * 60 * 1000;
+let sampleConfig = null;
+let configFetchedAt = 0;
+
+const refreshSampleConfig = () => {
+  if (Date.now() - configFetchedAt < CONFIG_REFRESH_MS) return;
+  configFetchedAt = Date.now();
+  fetch(`${BACKEND_URL}/api/analytics/config`)
+    .then((res) => (res.ok ? res.json() : null))
+    .then((config) => {
+      if (config) sampleConfig = config;
+    })
+    .catch(() => {
+      // Keep sending unsampled events if config is unavailable
+    });
+};
+
+const getSampleRate = (eventName) => {
+  if (!sampleConfig) return 1;
+  const rate = sampleConfig.sample_rates?.[eventName] ?? sampleConfig.default_rate;
+  return typeof rate === 'number' && rate > 0 && rate <= 1 ? rate : 1;
+};
+
 // Track an event
 const trackEvent = async (eventName, metadata = {}) => {
   if (!ANALYTICS_ENABLED) return;
   
   try {
+    refreshSampleConfig();
+    const sampleRate = getSampleRate(eventName);
+    if (Math.random() >= sampleRate) return;
+    
     const event = {
       event_name: eventName,
       page_path: window.location.pathname,
@@ -37,6 +65,7 @@ const trackEvent = async (eventName, metadata = {}) => {
       timestamp: new Date().toISOString(),
       ...getUtmParams(),
       metadata: metadata,
+      sample_rate: sampleRate,
     };
     
     // Fire and forget - don't wait for response
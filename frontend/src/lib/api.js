@@ -73,6 +73,13 @@ export const getErrorMessage = (error) => {
 };
 
 // Auth - requires backend, fails gracefully
+// Password and credential changes revoke every older token; keep the fresh one they return
+export const storeAuthToken = (token) => {
+  if (token) {
+    localStorage.setItem('pp_token', token);
+  }
+};
+
 export const authAPI = {
   register: (data) => api ? api.post('/auth/register', data) : Promise.reject(new Error('Backend not available')),
   login: (data) => api ? api.post('/auth/login', data) : Promise.reject(new Error('Backend not available')),
@@ -89,11 +96,11 @@ export const postsAPI = {
     { posts: STATIC_POSTS, total: STATIC_POSTS.length, page: 1, limit: 12, total_pages: 1 }
   ),
   getLatest: (limit = 6) => safeApiCall(
-    () => api.get(`/posts/latest?limit=${limit}`),
+    () => api.get(`/posts/latest?limit=${limit}&view=summary`),
     STATIC_POSTS.slice(0, limit)
   ),
   getPending: () => api ? api.get('/posts/pending') : Promise.resolve({ data: [] }),
-  getMyPosts: () => api ? api.get('/posts/my') : Promise.resolve({ data: [] }),
+  getMyPosts: () => api ? api.get('/posts/my', { params: { view: 'summary' } }) : Promise.resolve({ data: [] }),
   getOne: (id) => safeApiCall(
     () => api.get(`/posts/${id}`),
     STATIC_POSTS.find(p => p.id === id) || STATIC_POSTS[0]
@@ -177,6 +184,10 @@ export const adminAPI = {
   getUsers: (params = {}) => api ? api.get('/admin/users', { params }) : Promise.resolve({ data: [] }),
   updateUser: (id, data) => api ? api.put(`/admin/users/${id}`, data) : Promise.reject(new Error('Backend not available')),
   resetUserPassword: (userId) => api ? api.post(`/admin/users/${userId}/reset-password`) : Promise.reject(new Error('Backend not available')),
+  updateCredentials: (data) => api ? api.post('/admin/update-credentials', data).then((response) => {
+    storeAuthToken(response.data?.token);
+    return response;
+  }) : Promise.reject(new Error('Backend not available')),
   getAuditLogs: (params = {}) => api ? api.get('/admin/audit-logs', { params }) : Promise.resolve({ data: [] }),
   seed: () => api ? api.post('/seed') : Promise.reject(new Error('Backend not available')),
 };
@@ -187,6 +198,57 @@ export const notificationsAPI = {
   getUnreadCount: () => api ? api.get('/notifications/unread-count') : Promise.resolve({ data: { unread_count: 0 } }),
   markRead: (id) => api ? api.post(`/notifications/${id}/read`) : Promise.reject(new Error('Backend not available')),
   markAllRead: () => api ? api.post('/notifications/read-all') : Promise.reject(new Error('Backend not available')),
+  // Live updates over Server-Sent Events; returns an unsubscribe function.
+  // The stream is opened with a single-use ticket (never the JWT in the URL), so
+  // instead of letting EventSource retry the same URL we reconnect with a new ticket.
+  subscribe: (onEvent) => {
+    if (!api || !localStorage.getItem('pp_token') || typeof EventSource === 'undefined') return () => {};
+    let source = null;
+    let retryTimer = null;
+    let closed = false;
+    let reconnecting = false;
+
+    const retry = () => {
+      if (closed) return;
+      reconnecting = true;
+      retryTimer = setTimeout(connect, 5000);
+    };
+
+    const connect = async () => {
+      try {
+        const { data } = await api.post('/notifications/stream-ticket');
+        if (closed) return;
+        source = new EventSource(`${API_BASE}/notifications/stream?ticket=${encodeURIComponent(data.ticket)}`);
+        source.onopen = () => {
+          // Events may have been missed while disconnected
+          if (reconnecting) onEvent({ type: 'resync' });
+          reconnecting = false;
+        };
+        source.onerror = () => {
+          source.close();
+          retry();
+        };
+        ['notification', 'unread_count', 'resync'].forEach((type) => {
+          source.addEventListener(type, (e) => {
+            try {
+              onEvent(JSON.parse(e.data));
+            } catch {
+              // Ignore malformed events
+            }
+          });
+        });
+      } catch {
+        retry();
+      }
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      if (source) source.close();
+    };
+  },
 };
 
 // Profile - requires backend
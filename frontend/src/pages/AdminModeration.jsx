@@ -50,9 +50,39 @@ const AdminModeration = () => {
     loadData();
   }, [isAuthenticated, isAdmin, navigate, authLoading]);
 
-  const loadData = async () => {
+  // Live notification updates (replaces polling)
+  useEffect(() => {
+    if (authLoading || !isAuthenticated || !isAdmin) return;
+    
+    return notificationsAPI.subscribe((event) => {
+      if (event.type === 'notification') {
+        // The event carries the notification and an unread_count event follows it;
+        // only the pending list the new submission belongs to needs a refetch
+        setNotifications((prev) => [event.notification, ...prev.filter((n) => n.id !== event.notification.id)]);
+        refreshPending(event.notification.entity_type);
+      } else if (event.type === 'unread_count') {
+        setUnreadCount(event.unread_count);
+      } else if (event.type === 'resync') {
+        loadData({ silent: true });
+      }
+    });
+  }, [isAuthenticated, isAdmin, authLoading]);
+
+  const refreshPending = async (entityType) => {
+    try {
+      if (entityType === 'post') {
+        setPendingPosts((await postsAPI.getPending()).data);
+      } else if (entityType === 'action') {
+        setPendingActions((await actionsAPI.getPending()).data);
+      }
+    } catch (error) {
+      console.error('Error refreshing pending items:', error);
+    }
+  };
+
+  const loadData = async ({ silent = false } = {}) => {
     try {
-      setLoading(true);
+      if (!silent) setLoading(true);
       const [postsRes, actionsRes, notifRes, unreadRes] = await Promise.all([
         postsAPI.getPending(),
         actionsAPI.getPending(),
@@ -276,7 +276,7 @@ const Home = () => {
                     <CardContent className="p-6">
                       <h3 className="font-primary font-bold text-xl mb-3 group-hover:text-pp-magenta transition-colors">{post.title}</h3>
                       <p className="font-primary text-muted-foreground line-clamp-3 mb-4">
-                        {post.content}
+                        {post.excerpt || post.content}
                       </p>
                       <div className="flex items-center justify-between">
                         <span className="font-primary text-sm text-pp-magenta font-semibold">
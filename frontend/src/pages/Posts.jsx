@@ -34,7 +34,8 @@ const Posts = () => {
       const params = {
         page: pagination.page,
         limit: 12,
-        sort: sortOrder
+        sort: sortOrder,
+        view: 'summary'
       };
       if (searchQuery.trim()) {
         params.search = searchQuery.trim();
@@ -191,7 +192,7 @@ const Posts = () => {
                         {post.title}
                       </h3>
                       <p className="font-primary text-gray-600 text-sm line-clamp-3 mb-4">
-                        {post.content}
+                        {post.excerpt || post.content}
                       </p>
                       <div className="flex items-center justify-between text-xs text-gray-500">
                         <div className="flex items-center gap-4">
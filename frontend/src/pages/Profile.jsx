@@ -1,7 +1,7 @@
 import { useState, useEffect } from 'react';
 import { useNavigate, Link } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
-import { eventsAPI, actionsAPI, authAPI, postsAPI } from '../lib/api';
+import { eventsAPI, actionsAPI, authAPI, postsAPI, storeAuthToken } from '../lib/api';
 import { Button } from '../components/ui/button';
 import { Card, CardContent, CardHeader, CardTitle } from '../components/ui/card';
 import { Badge } from '../components/ui/badge';
@@ -97,7 +97,8 @@ const Profile = () => {
     }
     setChangingPassword(true);
     try {
-      await authAPI.changePassword(passwordForm.currentPassword, passwordForm.newPassword);
+      const response = await authAPI.changePassword(passwordForm.currentPassword, passwordForm.newPassword);
+      storeAuthToken(response.data?.token);
       toast.success('Password changed successfully');
       setPasswordForm({ currentPassword: '', newPassword: '', confirmPassword: '' });
     } catch (error) {
@@ -294,7 +295,7 @@ const Profile = () => {
                           <h4 className="font-primary font-semibold">{post.title}</h4>
                           {getStatusBadge(post.status)}
                         </div>
-                        <p className="text-sm text-muted-foreground font-primary line-clamp-2">{post.content}</p>
+                        <p className="text-sm text-muted-foreground font-primary line-clamp-2">{post.excerpt || post.content}</p>
                         {post.status === 'rejected' && post.rejection_reason && (
                           <div className="mt-2 p-2 bg-red-50 rounded-lg text-sm text-red-600 flex items-start gap-2">
                             <AlertCircle className="w-4 h-4 flex-shrink-0 mt-0.5" />